@@ -1,15 +1,24 @@
+import hashlib
 import os
+import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 from pathlib import Path
-from crud import get_user_by_username, get_user
-from dependencies import get_db
+from crud import get_user_by_username
+from dependencies import get_session
+from cache import user_cache
+from hashing import verify_password_sync
+from metrics import observe_bcrypt
+from expiring_keys import KeyStoreFull, create_key_store
+import crud_async
 
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -21,36 +30,70 @@ if not SECRET_KEY:
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-revoked_tokens = set()
+REVOCATION_BACKEND = os.getenv("REVOCATION_BACKEND", "memory")
+REVOCATION_MAX_ENTRIES = int(os.getenv("REVOCATION_MAX_ENTRIES", "100000"))
+
+revocation_store = create_key_store(REVOCATION_BACKEND, "revoked", REVOCATION_MAX_ENTRIES)
 
 def verify_password(plain: str, hashed: str):
-    return pwd_context.verify(plain, hashed)
+    started = time.perf_counter()
+    try:
+        return verify_password_sync(plain, hashed)
+    finally:
+        observe_bcrypt("verify", time.perf_counter() - started)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", secrets.token_hex(16))
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def authenticate_user(db: Session, username: str, password: str):
     user = get_user_by_username(db, username)
     if not user or not verify_password(password, user.password):
-        return False  
+        return False
     return user
 
-async def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_error():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def token_id(claims: dict, token: str) -> str:
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+async def ensure_not_revoked(token: str):
+    try:
+        jti = token_id(jwt.get_unverified_claims(token), token)
+    except JWTError:
+        raise credentials_error()
+    if revocation_store.blocking:
+        revoked = await run_in_threadpool(revocation_store.contains, jti)
+    else:
+        revoked = revocation_store.contains(jti)
+    if revoked:
+        raise credentials_error()
+
+def revoke_token(token: str) -> bool:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    try:
+        revocation_store.add(token_id(payload, token), float(payload["exp"]))
+    except KeyStoreFull:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many revoked tokens")
+    return True
+
+def get_user_id_from_token(token: str) -> int:
+    credentials_exception = credentials_error()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if token in revoked_tokens:
-            raise credentials_exception
         user_id_str = payload.get("sub")
         if user_id_str is None:
             raise credentials_exception
@@ -60,7 +103,33 @@ async def get_current_user(db: Session = Depends(get_db), token: str = Depends(o
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user(db, user_id)
+    return user_id
+
+class UserPrincipal:
+    __slots__ = ("id", "username", "role", "api_key")
+
+    def __init__(self, id: int, username: str, role: str, api_key: str):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.api_key = api_key
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.role, user.api_key)
+
+def cache_principal(user) -> UserPrincipal:
+    principal = UserPrincipal.from_user(user)
+    user_cache.set(principal.id, principal)
+    return principal
+
+async def get_current_user(db: AsyncSession = Depends(get_session), token: str = Depends(oauth2_scheme)):
+    await ensure_not_revoked(token)
+    user_id = get_user_id_from_token(token)
+    principal = user_cache.get(user_id)
+    if principal is not None:
+        return principal
+    user = await crud_async.get_user(db, user_id)
     if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_error()
+    return cache_principal(user)
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from common import ROOT, http_load, make_session_factory, percentile, temp_db_url, wait_for_port
+
+from models import Category, Event, User
+
+def seed(url: str, events: int):
+    engine, SessionLocal = make_session_factory(url)
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    cat = Category(name="bench")
+    db.add_all([user, cat])
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.add_all(Event(title=f"event {i}", date=start + timedelta(minutes=i), seats=100,
+                     category_id=cat.id, owner_id=user.id) for i in range(events))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+def run_mode(async_mode: bool, args):
+    url = temp_db_url("async" if async_mode else "sync")
+    seed(url, args.events)
+    workdir = Path(url.replace("sqlite:///", "")).parent
+    env = dict(os.environ, DB_ASYNC="1" if async_mode else "0", PYTHONPATH=str(ROOT))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        paths = ["/events?limit=20"] + [f"/events/{i}" for i in range(1, min(args.events, 200) + 1)]
+        latencies, errors, elapsed = asyncio.run(
+            http_load("127.0.0.1", args.port, paths, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+    label = "async" if async_mode else "sync"
+    print(f"{label:>6}: {len(latencies) / elapsed:8.1f} req/s  p50={percentile(latencies, 50) * 1000:7.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:7.2f}ms  errors={errors}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async database modes over uvicorn")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run_mode(False, args)
+    run_mode(True, args)
+
+if __name__ == "__main__":
+    main()
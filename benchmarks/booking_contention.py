@@ -0,0 +1,90 @@
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from common import Timer, make_session_factory, temp_db_url
+
+from models import Booking, Category, Event, User
+from schemas import BookingCreate
+import crud
+
+def legacy_create_booking(db, booking, user_id):
+    event = crud.get_event(db, booking.event_id)
+    if not event:
+        return None
+    if event.date <= datetime.utcnow():
+        return None
+    if event.seats < booking.seats:
+        return None
+    db_booking = Booking(**booking.dict(), user_id=user_id)
+    event.seats -= booking.seats
+    db.add(db_booking)
+    db.commit()
+    db.refresh(db_booking)
+    return db_booking
+
+def seed(SessionLocal, seats: int) -> int:
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    cat = Category(name="bench")
+    db.add_all([user, cat])
+    db.flush()
+    event = Event(title="hot", date=datetime.utcnow() + timedelta(days=1), seats=seats,
+                  category_id=cat.id, owner_id=user.id)
+    db.add(event)
+    db.commit()
+    event_id = event.id
+    db.close()
+    return event_id
+
+def run(book, label: str, threads: int, attempts: int, seats: int):
+    engine, SessionLocal = make_session_factory(temp_db_url(label))
+    event_id = seed(SessionLocal, seats)
+    counters = {"ok": 0, "rejected": 0, "errors": 0}
+    guard = threading.Lock()
+
+    def worker():
+        for _ in range(attempts):
+            db = SessionLocal()
+            try:
+                result = book(db, BookingCreate(event_id=event_id, seats=1), 1)
+                key = "ok" if result else "rejected"
+            except Exception:
+                db.rollback()
+                key = "errors"
+            finally:
+                db.close()
+            with guard:
+                counters[key] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    with Timer() as t:
+        for th in pool:
+            th.start()
+        for th in pool:
+            th.join()
+
+    db = SessionLocal()
+    booked = sum(b.seats for b in db.query(Booking).all())
+    remaining = crud.get_event(db, event_id).seats
+    db.close()
+    engine.dispose()
+    oversold = max(0, booked - seats)
+    print(f"{label:>10}: {counters['ok'] / t.elapsed:8.1f} bookings/s  ok={counters['ok']} "
+          f"rejected={counters['rejected']} errors={counters['errors']} booked={booked} "
+          f"remaining={remaining} oversold={oversold} consistent={booked + remaining == seats}")
+    return oversold
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer one event from many threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument("--seats", type=int, default=500)
+    args = parser.parse_args()
+    run(legacy_create_booking, "legacy", args.threads, args.attempts, args.seats)
+    oversold = run(crud.create_booking, "atomic", args.threads, args.attempts, args.seats)
+    if oversold:
+        raise SystemExit("atomic reservation oversold the event")
+
+if __name__ == "__main__":
+    main()
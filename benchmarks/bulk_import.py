@@ -0,0 +1,90 @@
+import argparse
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+from common import Timer, temp_db_url
+
+os.environ["DATABASE_URL"] = temp_db_url("bulk")
+
+from database import Base, SessionLocal, engine
+from models import Category, Event, User
+from schemas import EventCreate
+import bulk
+import crud
+import search
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    search.init_search(engine)
+    db = SessionLocal()
+    db.add(Category(name="bench"))
+    db.add(User(username="owner", password="x", api_key="key", role="admin"))
+    db.commit()
+    db.close()
+
+def event_lines(count: int, offset: int = 0):
+    start = datetime.utcnow() + timedelta(days=30)
+    for i in range(offset, offset + count):
+        yield json.dumps({"title": f"event {i}", "date": (start + timedelta(minutes=i)).isoformat(),
+                          "seats": 100, "category_name": "bench"}) + "\n"
+
+def run():
+    parser = argparse.ArgumentParser(description="Bulk NDJSON import/export versus one request per row")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--per-row", type=int, default=2000, help="rows inserted through crud for comparison")
+    parser.add_argument("--bookings", type=int, default=50000)
+    args = parser.parse_args()
+    seed()
+
+    db = SessionLocal()
+    with Timer() as t:
+        for line in event_lines(args.per_row, offset=args.events):
+            crud.create_event(db, EventCreate.model_validate_json(line), owner_id=1)
+    per_row = t.elapsed / args.per_row
+    print(f"per-row crud:  {args.per_row:7d} events in {t.elapsed:6.2f}s "
+          f"(~{per_row * args.events:6.1f}s for {args.events})")
+    db.close()
+
+    report = bulk.ImportReport()
+    db = SessionLocal()
+    with Timer() as t:
+        for batch in bulk.read_batches(event_lines(args.events), "ndjson"):
+            bulk.import_events(db, batch, 1, report)
+    db.close()
+    print(f"bulk import:   {report.inserted:7d} events in {t.elapsed:6.2f}s "
+          f"({report.inserted / t.elapsed:,.0f} rows/s, {report.failed} failed)")
+    assert report.inserted == args.events
+
+    event_ids = list(range(1, args.events + 1))
+    lines = (json.dumps({"event_id": event_ids[i % len(event_ids)], "seats": 1}) + "\n" for i in range(args.bookings))
+    report = bulk.ImportReport()
+    db = SessionLocal()
+    with Timer() as t:
+        for batch in bulk.read_batches(lines, "ndjson"):
+            bulk.import_bookings(db, batch, 1, True, report)
+    print(f"bulk bookings: {report.inserted:7d} rows   in {t.elapsed:6.2f}s ({report.failed} failed)")
+    remaining = db.query(Event.seats).filter(Event.id == 1).scalar()
+    expected = 100 - len(range(0, args.bookings, len(event_ids)))
+    assert remaining == expected, (remaining, expected)
+    db.close()
+
+    overbook = (json.dumps({"event_id": 2, "seats": 60}) + "\n" for _ in range(2))
+    report = bulk.ImportReport()
+    db = SessionLocal()
+    for batch in bulk.read_batches(overbook, "ndjson"):
+        bulk.import_bookings(db, batch, 1, True, report)
+    db.close()
+    assert report.inserted == 1 and report.errors[0]["error"] == "Not enough seats", report.as_dict()
+
+    for fmt in bulk.FORMATS:
+        out = io.StringIO()
+        with Timer() as t:
+            for chunk in bulk.export_rows("events", fmt):
+                out.write(chunk)
+        rows = out.getvalue().count("\n") - (1 if fmt == "csv" else 0)
+        print(f"export {fmt:6s}: {rows:7d} events in {t.elapsed:6.2f}s")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,109 @@
+import argparse
+import random
+import threading
+from datetime import datetime, timedelta
+
+from common import Timer, make_session_factory, temp_db_url
+
+from sqlalchemy import event, func
+
+from models import Booking, Category, Event, User
+from schemas import BookingCreate
+import crud
+
+def seed(SessionLocal, events: int, seats: int) -> list:
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    cat = Category(name="bench")
+    db.add_all([user, cat])
+    db.flush()
+    rows = [Event(title=f"event {i}", date=datetime.utcnow() + timedelta(days=1), seats=seats,
+                  category_id=cat.id, owner_id=user.id) for i in range(events)]
+    db.add_all(rows)
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+def checkout_one_by_one(db, items, user_id):
+    created = []
+    for item in items:
+        booking = crud.create_booking(db, item, user_id)
+        if booking is None:
+            return None
+        created.append(booking)
+    return created
+
+def checkout_batch(db, items, user_id):
+    created, _ = crud.create_bookings(db, items, user_id)
+    return created
+
+def run_mode(checkout, label: str, threads: int, carts: int, events: int, cart_size: int, seats: int, seed_value: int):
+    engine, SessionLocal = make_session_factory(temp_db_url(label))
+    event_ids = seed(SessionLocal, events, seats)
+    counters = {"ok": 0, "rejected": 0, "errors": 0, "statements": 0, "commits": 0}
+    guard = threading.Lock()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        with guard:
+            counters["statements"] += 1
+
+    def count_commit(conn):
+        with guard:
+            counters["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+
+    def worker(index: int):
+        rng = random.Random(seed_value + index)
+        for _ in range(carts):
+            picked = rng.sample(event_ids, cart_size)
+            items = [BookingCreate(event_id=event_id, seats=rng.randint(1, 3)) for event_id in picked]
+            db = SessionLocal()
+            try:
+                key = "ok" if checkout(db, items, 1) else "rejected"
+            except Exception:
+                db.rollback()
+                key = "errors"
+            finally:
+                db.close()
+            with guard:
+                counters[key] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    with Timer() as t:
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+    db = SessionLocal()
+    booked = dict(db.query(Booking.event_id, func.sum(Booking.seats)).group_by(Booking.event_id).all())
+    remaining = dict(db.query(Event.id, Event.seats).all())
+    oversold = sum(1 for event_id in event_ids if remaining[event_id] < 0)
+    mismatched = sum(1 for event_id in event_ids if remaining[event_id] + booked.get(event_id, 0) != seats)
+    partial = db.query(Booking).count() - counters["ok"] * cart_size
+    db.close()
+    total = threads * carts
+    print(f"{label:12s} {total / t.elapsed:8.1f} carts/s ok={counters['ok']} rejected={counters['rejected']} "
+          f"errors={counters['errors']} statements/cart={counters['statements'] / total:5.1f} "
+          f"commits/cart={counters['commits'] / total:4.2f} oversold={oversold} mismatched={mismatched} "
+          f"bookings from rejected carts={partial}")
+    return mismatched + partial
+
+def run():
+    parser = argparse.ArgumentParser(description="Multi-event checkout: N bookings versus one batch")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--carts", type=int, default=50)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--cart-size", type=int, default=4)
+    parser.add_argument("--seats", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    options = (args.threads, args.carts, args.events, args.cart_size, args.seats, args.seed)
+    run_mode(checkout_one_by_one, "one-by-one", *options)
+    assert run_mode(checkout_batch, "batch", *options) == 0
+
+if __name__ == "__main__":
+    run()
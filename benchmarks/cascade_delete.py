@@ -0,0 +1,76 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from common import make_session_factory, temp_db_url
+
+from sqlalchemy import event, func, select
+
+from models import Booking, Category, Event, Review, User
+import crud
+
+def seed(SessionLocal, bookings: int, events: int):
+    db = SessionLocal()
+    db.add_all([User(username="admin", password="x", api_key="admin", role="admin"),
+                User(username="leaving", password="x", api_key="leaving", role="user")])
+    db.add(Category(name="bench"))
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    booked = [bookings // events + (i < bookings % events) for i in range(events)]
+    db.execute(Event.__table__.insert(), [{"title": f"event {i}", "date": start, "seats": 1000 - booked[i],
+                                           "category_id": 1, "owner_id": 1 + i % 2} for i in range(events)])
+    db.execute(Booking.__table__.insert(), [{"user_id": 2, "event_id": 1 + i % events, "seats": 1}
+                                            for i in range(bookings)])
+    db.execute(Review.__table__.insert(), [{"user_id": 2, "event_id": 1 + i, "rating": 4.0, "text": "ok"}
+                                           for i in range(0, events, 2)])
+    db.commit()
+    db.close()
+
+def orm_delete(db, user_id: int):
+    user = db.get(User, user_id)
+    for child in user.bookings + user.reviews:
+        child.user_id = None
+    for owned in user.events:
+        owned.owner_id = None
+    db.delete(user)
+    db.commit()
+
+def set_based_delete(db, user_id: int):
+    crud.delete_user(db, user_id, "reassign", 1)
+
+def measure(label: str, bookings: int, events: int, delete):
+    engine, SessionLocal = make_session_factory(temp_db_url(f"cascade-{label}"))
+    seed(SessionLocal, bookings, events)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", record)
+    db = SessionLocal()
+    start = time.perf_counter()
+    delete(db, 2)
+    elapsed = time.perf_counter() - start
+    db.close()
+    event.remove(engine, "before_cursor_execute", record)
+    db = SessionLocal()
+    left = db.scalar(select(func.count(Booking.id)).where(Booking.deleted_at.is_(None),
+                                                            Booking.user_id.is_(None) | (Booking.user_id == 2)))
+    seats = db.scalar(select(func.sum(Event.seats)))
+    db.close()
+    engine.dispose()
+    print(f"{label:10s} {elapsed * 1000:9.1f}ms statements={len(statements):4d} parameter sets={sum(statements):6d} "
+          f"orphan bookings left={left:6d} seats available={seats}")
+
+def run():
+    parser = argparse.ArgumentParser(description="Delete a user with many bookings: ORM cascade versus set-based SQL")
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"user with {args.bookings} bookings on {args.events} events of 1000 seats "
+          f"({args.events * 1000} seats once the bookings are released)")
+    measure("orm", args.bookings, args.events, orm_delete)
+    measure("set-based", args.bookings, args.events, set_based_delete)
+
+if __name__ == "__main__":
+    run()
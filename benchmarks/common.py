@@ -0,0 +1,119 @@
+import os
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from sqlalchemy.orm import sessionmaker
+
+def temp_db_url(name: str = "bench") -> str:
+    path = Path(tempfile.mkdtemp(prefix=f"{name}-")) / "database.db"
+    return f"sqlite:///{path}"
+
+def make_session_factory(url: str, pragmas: dict = None):
+    from database import Base, create_db_engine
+    import models  # noqa: F401
+    engine = create_db_engine(url, pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def percentile(samples, p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+async def http_request(reader, writer, host: str, request) -> int:
+    if isinstance(request, str):
+        method, path, body, headers = "GET", request, b"", {}
+    else:
+        method, path, body, headers = request
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\nContent-Length: {len(body)}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+def next_request(requests, i: int):
+    return requests(i) if callable(requests) else requests[i % len(requests)]
+
+async def asgi_load(client, requests, concurrency: int, duration: float):
+    import asyncio
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            request = next_request(requests, i)
+            if isinstance(request, str):
+                request = ("GET", request, b"", {})
+            method, path, body, headers = request
+            start = time.perf_counter()
+            response = await client.request(method, path, content=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return latencies, errors, time.perf_counter() - started
+
+async def http_load(host: str, port: int, requests, concurrency: int, duration: float):
+    import asyncio
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def client(n: int):
+        reader, writer = await asyncio.open_connection(host, port)
+        i = n
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await http_request(reader, writer, host, next_request(requests, i))
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            i += 1
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return latencies, errors, time.perf_counter() - started
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0):
+    import socket
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on {host}:{port} did not start")
@@ -0,0 +1,68 @@
+import argparse
+from datetime import datetime, timedelta
+
+from common import Timer, make_session_factory, temp_db_url
+
+from sqlalchemy import event
+
+from models import Category, Event, SeatHold, User
+import holds
+
+def seed(SessionLocal, active: int, expired: int, waiting: int):
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    cat = Category(name="bench")
+    db.add_all([user, cat])
+    db.flush()
+    events = [Event(title=f"event {i}", date=datetime.utcnow() + timedelta(days=1), seats=0,
+                    category_id=cat.id, owner_id=user.id) for i in range(100)]
+    db.add_all(events)
+    db.flush()
+    now = datetime.utcnow()
+    rows = []
+    for i in range(active + expired):
+        expires_at = now + timedelta(hours=1) if i < active else now - timedelta(seconds=1)
+        rows.append({"event_id": events[i % len(events)].id, "user_id": user.id, "seats": 1,
+                     "status": holds.HELD, "expires_at": expires_at, "created_at": now})
+    for i in range(waiting):
+        rows.append({"event_id": events[i % len(events)].id, "user_id": user.id, "seats": 1,
+                     "status": holds.WAITING, "expires_at": None, "created_at": now})
+    db.execute(SeatHold.__table__.insert(), rows)
+    db.commit()
+    db.close()
+
+def naive_sweep(db) -> int:
+    now = datetime.utcnow()
+    return sum(1 for hold in db.query(SeatHold).filter(SeatHold.status == holds.HELD).all() if hold.expires_at <= now)
+
+def measure(engine, SessionLocal, sweep):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = SessionLocal()
+    try:
+        with Timer() as t:
+            expired = sweep(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    return expired, t.elapsed, len(statements)
+
+def run():
+    parser = argparse.ArgumentParser(description="Seat hold expiry: indexed sweep versus scanning every hold")
+    parser.add_argument("--active", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--expired", type=int, default=200)
+    parser.add_argument("--waiting", type=int, default=0)
+    args = parser.parse_args()
+    for active in args.active:
+        for label, sweep in (("scan", naive_sweep), ("indexed", holds.expire_holds)):
+            engine, SessionLocal = make_session_factory(temp_db_url("holds"))
+            seed(SessionLocal, active, args.expired, args.waiting)
+            expired, elapsed, statements = measure(engine, SessionLocal, sweep)
+            print(f"{label:8s} active={active:7d} expired={expired:5d} {elapsed * 1000:9.1f} ms statements={statements}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,167 @@
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+from common import temp_db_url
+
+os.environ["DATABASE_URL"] = temp_db_url("advisor")
+
+from sqlalchemy import event, text
+
+from database import Base, SessionLocal, engine
+from models import Booking, Event
+from schemas import BookingCreate, CategoryCreate, EventCreate, ReviewCreate, UserCreate, UserUpdate
+import compaction
+import crud
+import migrations
+import search
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+
+ALLOWED_SCANS = {
+    ("get_users", "users"),
+    ("get_categories", "categories"),
+}
+ALLOWED_SORTS = {"search_events"}
+
+def seed(db):
+    for name in ("alice", "bob", "carol"):
+        crud.create_user(db, UserCreate(username=name, password="x"), hashed_password="x")
+    crud.create_category(db, CategoryCreate(name="music"))
+    soon = datetime.utcnow() + timedelta(days=10)
+    for i in range(5):
+        crud.create_event(db, EventCreate(title=f"Concert {i}", date=soon + timedelta(days=i), seats=50,
+                                          category_name="music"), owner_id=1)
+    past = Event(title="Old show", date=datetime.utcnow() - timedelta(days=1), seats=10, category_id=1, owner_id=1)
+    db.add(past)
+    db.add(Booking(seats=1, user_id=2, event_id=6))
+    db.commit()
+
+def scenarios():
+    after_event = (datetime.utcnow(), 0)
+    return [
+        ("get_user", lambda db: crud.get_user(db, 1)),
+        ("get_user_by_username", lambda db: crud.get_user_by_username(db, "alice")),
+        ("get_users", lambda db: crud.get_users(db, 0, 10, after_id=1)),
+        ("update_user", lambda db: crud.update_user(db, 3, UserUpdate(role="user"))),
+        ("get_categories", lambda db: crud.get_categories(db)),
+        ("get_category_by_name", lambda db: crud.get_category_by_name(db, "music")),
+        ("get_category", lambda db: crud.get_category(db, 1)),
+        ("create_event", lambda db: crud.create_event(
+            db, EventCreate(title="New", date=datetime.utcnow() + timedelta(days=30), seats=5,
+                            category_name="music"), owner_id=1)),
+        ("get_event", lambda db: crud.get_event(db, 1)),
+        ("get_events", lambda db: crud.get_events(db, 0, 10)),
+        ("get_events_after", lambda db: crud.get_events(db, 0, 10, after=after_event)),
+        ("update_event", lambda db: crud.update_event(db, 2, {"title": "Renamed", "category_name": "music"})),
+        ("get_event_stats", lambda db: crud.get_event_stats(db, 6)),
+        ("search_events", lambda db: search.search_events(db, "concert", 10, category_id=1)),
+        ("resolve_category_ids", lambda db: crud.resolve_category_ids(db, ["music", "jazz"])),
+        ("get_available_event_rows", lambda db: crud.get_available_event_rows(
+            db, [1], datetime.utcnow(), datetime.utcnow() + timedelta(days=30), 2, "date", 10, after=after_event)),
+        ("get_available_event_rows_seats", lambda db: crud.get_available_event_rows(
+            db, None, None, None, 10, "-seats", 10, after=(40, 3))),
+        ("create_booking", lambda db: crud.create_booking(db, BookingCreate(event_id=1, seats=2), user_id=2)),
+        ("create_bookings", lambda db: crud.create_bookings(
+            db, [BookingCreate(event_id=3, seats=1), BookingCreate(event_id=4, seats=1)], user_id=3)),
+        ("get_booking", lambda db: crud.get_booking(db, 1)),
+        ("get_user_bookings", lambda db: crud.get_user_bookings(db, 2, 10, after_id=0)),
+        ("get_user_booking_history", lambda db: crud.get_user_booking_history(db, 2, 10, after_id=0)),
+        ("update_booking", lambda db: crud.update_booking(db, 2, {"seats": 3}, user_id=2)),
+        ("create_review", lambda db: crud.create_review(db, ReviewCreate(event_id=6, text="ok", rating=4), user_id=2)),
+        ("get_review", lambda db: crud.get_review(db, 1)),
+        ("get_reviews_by_event", lambda db: crud.get_reviews_by_event(db, 6)),
+        ("get_review_response", lambda db: crud.get_review_response(db, 1)),
+        ("get_event_review_responses", lambda db: crud.get_event_review_responses(db, 6, 10, after_id=0)),
+        ("update_review", lambda db: crud.update_review(db, 1, {"rating": 2}, user_id=2)),
+        ("delete_review", lambda db: crud.delete_review(db, 1, user_id=2)),
+        ("cancel_booking", lambda db: crud.cancel_booking(db, 2, user_id=2)),
+        ("delete_event", lambda db: crud.delete_event(db, 5)),
+        ("delete_category", lambda db: crud.delete_category(db, 99)),
+        ("delete_user", lambda db: crud.delete_user(db, 99)),
+        ("compact_batch", lambda db: [compaction.compact_batch(db, model, archive, datetime.utcnow())
+                                      for model, archive in compaction.ARCHIVES]),
+    ]
+
+def capture(db, label, fn, statements):
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            params = parameters[0] if executemany and parameters else parameters
+            statements.append((label, statement, params))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+def explain(connection, statement, params) -> list:
+    cursor = connection.cursor()
+    try:
+        return [row[-1] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, params or ())]
+    finally:
+        cursor.close()
+
+def problems(label: str, plan: list) -> list:
+    found = []
+    for line in plan:
+        match = FULL_SCAN.match(line)
+        if match and (label, match.group(1)) not in ALLOWED_SCANS:
+            found.append(line)
+        elif TEMP_SORT.search(line) and label not in ALLOWED_SORTS:
+            found.append(line)
+    return found
+
+def drop_secondary_indexes():
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if not index.name.startswith(("ix_users", "ix_categories", "ix_expiring", "ix_events_title")):
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+def run():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN every crud query and flag full scans")
+    parser.add_argument("--without-indexes", action="store_true",
+                        help="drop the secondary indexes first to see what the advisor reports")
+    parser.add_argument("--verbose", "-v", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    migrations.migrate(engine)
+    search.init_search(engine)
+    if args.without_indexes:
+        drop_secondary_indexes()
+
+    db = SessionLocal()
+    seed(db)
+    statements = []
+    for label, fn in scenarios():
+        capture(db, label, fn, statements)
+    db.close()
+
+    raw = engine.raw_connection()
+    flagged = 0
+    seen = set()
+    try:
+        for label, statement, params in statements:
+            if (label, statement) in seen:
+                continue
+            seen.add((label, statement))
+            plan = explain(raw, statement, params)
+            issues = problems(label, plan)
+            flagged += bool(issues)
+            if issues or args.verbose:
+                print(f"{'FLAG' if issues else 'ok  '} {label}: {' '.join(statement.split())[:150]}")
+                for line in plan:
+                    print(f"       {'!' if line in issues else ' '} {line}")
+    finally:
+        raw.close()
+    covered = len({label for label, _, _ in statements})
+    print(f"{len(seen)} queries from {covered} crud functions, {flagged} flagged")
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    sys.exit(run())
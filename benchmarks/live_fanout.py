@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from common import percentile
+
+from live import SeatHub
+
+async def viewer(subscription, received: list, latencies: list, published_at: dict, done: asyncio.Event):
+    while not done.is_set():
+        await subscription.wake.wait()
+        now = time.perf_counter()
+        for event_id, seats in subscription.drain().items():
+            received.append(seats)
+            latencies.append(now - published_at[event_id])
+
+async def run_fanout(subscribers: int, events: int, writes: int, rate: float, duration: float):
+    seats = {event_id: 1000 for event_id in range(events)}
+    loads = []
+
+    def load(event_ids):
+        loads.append(len(event_ids))
+        return {event_id: seats[event_id] for event_id in event_ids}
+
+    hub = SeatHub(load=load, max_rate=rate, max_subscribers=subscribers)
+    received, latencies, published_at = [], [], {}
+    done = asyncio.Event()
+    subscriptions = [hub.subscribe([i % events]) for i in range(subscribers)]
+    tasks = [asyncio.create_task(viewer(s, received, latencies, published_at, done)) for s in subscriptions]
+
+    def writer():
+        for i in range(writes):
+            event_id = i % events
+            seats[event_id] -= 1
+            published_at[event_id] = time.perf_counter()
+            hub.publish(event_id)
+            time.sleep(duration / writes)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.01)
+    while any(s.pending for s in subscriptions) or hub.dirty:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(1.0 / rate if rate > 0 else 0.05)
+    elapsed = time.perf_counter() - start
+    done.set()
+    for subscription in subscriptions:
+        subscription.wake.set()
+    await asyncio.gather(*tasks)
+    await hub.stop()
+    return elapsed, received, latencies, loads
+
+def run():
+    parser = argparse.ArgumentParser(description="Seat availability fan-out through the in-process hub")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=2.0, help="max updates per second per event")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds the writes are spread over")
+    args = parser.parse_args()
+    elapsed, received, latencies, loads = asyncio.run(
+        run_fanout(args.subscribers, args.events, args.writes, args.rate, args.duration))
+    print(f"{args.writes} seat changes on {args.events} events over {args.duration:g}s, "
+          f"{args.subscribers} subscribers, max {args.rate:g}/s per event")
+    print(f"  seat queries: {len(loads)} (vs {args.writes * args.subscribers // args.events} polls "
+          f"if every viewer re-read after each change)")
+    print(f"  messages delivered: {len(received)} ({len(received) / args.subscribers:.1f} per subscriber) "
+          f"in {elapsed:.2f}s")
+    print(f"  publish to delivery p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    run()
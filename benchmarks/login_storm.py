@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from common import ROOT, http_load, make_session_factory, percentile, temp_db_url, wait_for_port
+
+from models import Category, Event, User
+
+def seed(url: str, users: int, rounds: int):
+    from passlib.context import CryptContext
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash("password")
+    engine, SessionLocal = make_session_factory(url)
+    db = SessionLocal()
+    db.add_all(User(username=f"user{i}", password=hashed, api_key=f"key{i}", role="user") for i in range(users))
+    cat = Category(name="bench")
+    db.add(cat)
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.add_all(Event(title=f"event {i}", date=start + timedelta(minutes=i), seats=100,
+                     category_id=cat.id, owner_id=1) for i in range(500))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+async def storm(args):
+    logins = [("POST", "/auth/login", f"username=user{i}&password=password".encode(),
+               {"Content-Type": "application/x-www-form-urlencoded"}) for i in range(args.users)]
+    browse = http_load("127.0.0.1", args.port, ["/events?limit=20"], args.browsers, args.duration)
+    login = http_load("127.0.0.1", args.port, logins, args.logins, args.duration)
+    return await asyncio.gather(browse, login)
+
+def run_mode(label: str, hash_workers: int, args):
+    url = temp_db_url(label)
+    seed(url, args.users, args.rounds)
+    env = dict(os.environ, HASH_WORKERS=str(hash_workers), BCRYPT_ROUNDS=str(args.rounds),
+               HASH_MAX_PENDING=str(args.max_pending), PYTHONPATH=str(ROOT))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=Path(url.replace("sqlite:///", "")).parent, env=env,
+    )
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        quiet, _, _ = asyncio.run(http_load("127.0.0.1", args.port, ["/events?limit=20"], args.browsers, 3))
+        (browse, _, _), (login, rejected, elapsed) = asyncio.run(storm(args))
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{label:>8}: /events p50 {percentile(quiet, 50) * 1000:6.1f}ms -> {percentile(browse, 50) * 1000:7.1f}ms, "
+          f"p99 {percentile(quiet, 99) * 1000:6.1f}ms -> {percentile(browse, 99) * 1000:7.1f}ms during storm; "
+          f"logins {len(login) - rejected} ok, {rejected} rejected ({len(login) / elapsed:.1f}/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="/events latency during a login storm")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--browsers", type=int, default=10, help="concurrent /events clients")
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--max-pending", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    run_mode("inline", 0, args)
+    run_mode("pool", os.cpu_count() or 1, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from common import Timer, temp_db_url
+
+os.environ["DATABASE_URL"] = temp_db_url("ratings")
+
+from sqlalchemy import event, func
+
+from database import SessionLocal, engine
+from models import Category, Event, EventRating, Review, User
+from schemas import event_list_adapter
+import crud
+import main
+import ratings
+
+def seed(events: int, reviews_per_event: int, rng: random.Random):
+    db = SessionLocal()
+    cat = Category(name="bench")
+    db.add(cat)
+    db.add_all(User(username=f"user{i}", password="x", api_key=f"key{i}", role="user")
+               for i in range(reviews_per_event))
+    db.flush()
+    past = datetime.utcnow() - timedelta(days=1)
+    db.add_all(Event(title=f"event {i}", date=past, seats=0, category_id=cat.id, owner_id=1) for i in range(events))
+    db.flush()
+    db.add_all(Review(text="ok", rating=rng.choice([1, 2, 3, 3.5, 4, 4.5, 5]), user_id=u + 1, event_id=e + 1,
+                      is_edited=0)
+               for e in range(events) for u in range(reviews_per_event))
+    db.commit()
+    db.close()
+
+def count_queries(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Timer() as t:
+            result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements, t.elapsed
+
+def legacy_ratings(db, limit):
+    return [(e.id, db.query(func.count(Review.id), func.avg(Review.rating)).filter(Review.event_id == e.id).one())
+            for e in db.query(Event).order_by(Event.date, Event.id).limit(limit).all()]
+
+def expected_aggregates(db):
+    histograms = {}
+    for event_id, rating in db.query(Review.event_id, Review.rating):
+        histogram = histograms.setdefault(event_id, {star: 0 for star in ratings.STARS})
+        histogram[ratings.star_bucket(rating)] += 1
+    return {
+        event_id: (count, round(total, 6), low, high, histograms[event_id])
+        for event_id, count, total, low, high in db.query(
+            Review.event_id, func.count(Review.id), func.sum(Review.rating), func.min(Review.rating),
+            func.max(Review.rating)).group_by(Review.event_id)
+    }
+
+def stored_aggregates(db):
+    return {
+        r.event_id: (r.review_count, round(r.rating_sum, 6), r.rating_min, r.rating_max, r.histogram)
+        for r in db.query(EventRating).filter(EventRating.review_count > 0)
+    }
+
+def churn(db, rng: random.Random, operations: int):
+    reviews = db.query(Review).all()
+    for _ in range(operations):
+        review = rng.choice(reviews)
+        if rng.random() < 0.5:
+            old = review.rating
+            review.rating = rng.choice([1, 2, 3, 4, 5])
+            ratings.remove_rating(db, review.event_id, old)
+            ratings.add_rating(db, review.event_id, review.rating)
+        else:
+            reviews.remove(review)
+            db.delete(review)
+            ratings.remove_rating(db, review.event_id, review.rating)
+        db.commit()
+
+def run():
+    parser = argparse.ArgumentParser(description="Check precomputed rating aggregates and their query cost")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--reviews-per-event", type=int, default=50)
+    parser.add_argument("--churn", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    seed(args.events, args.reviews_per_event, rng)
+
+    db = SessionLocal()
+    with Timer() as t:
+        count = ratings.rebuild_ratings(db)
+    print(f"rebuild:        {count:5d} events in {t.elapsed * 1000:7.1f}ms")
+    assert stored_aggregates(db) == expected_aggregates(db)
+    db.close()
+
+    db = SessionLocal()
+    rows, statements, elapsed = count_queries(lambda: legacy_ratings(db, args.events))
+    print(f"per-event avg:  {len(statements):5d} queries, {elapsed * 1000:7.1f}ms for {len(rows)} events")
+    db.close()
+
+    db = SessionLocal()
+    page, statements, elapsed = count_queries(
+        lambda: event_list_adapter.validate_python(crud.get_events(db, 0, args.events), from_attributes=True))
+    print(f"aggregates:     {len(statements):5d} queries, {elapsed * 1000:7.1f}ms for {len(page)} events")
+    assert len(statements) == 1, statements
+    assert all(e.review_count == args.reviews_per_event and e.average_rating for e in page)
+    db.close()
+
+    db = SessionLocal()
+    churn(db, rng, args.churn)
+    assert stored_aggregates(db) == expected_aggregates(db)
+    db.close()
+    print("OK: aggregates match a full recount after incremental updates")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,79 @@
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from common import Timer, make_session_factory, percentile, temp_db_url
+
+from database import SQLITE_PRAGMAS
+from models import Category, Event, User
+from schemas import BookingCreate
+import crud
+
+LEGACY_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+def seed(SessionLocal, events: int):
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    cat = Category(name="bench")
+    db.add_all([user, cat])
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.add_all(Event(title=f"event {i}", date=start + timedelta(minutes=i), seats=1_000_000,
+                     category_id=cat.id, owner_id=user.id) for i in range(events))
+    db.commit()
+    db.close()
+
+def run(label: str, pragmas: dict, args):
+    engine, SessionLocal = make_session_factory(temp_db_url(label), pragmas)
+    seed(SessionLocal, args.events)
+    stop = threading.Event()
+    read_latencies, writes = [], [0]
+    guard = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            db = SessionLocal()
+            start = time.perf_counter()
+            crud.get_events(db, random.randrange(max(args.events - 100, 1)), 100)
+            elapsed = time.perf_counter() - start
+            db.close()
+            with guard:
+                read_latencies.append(elapsed)
+
+    def writer():
+        while not stop.is_set():
+            db = SessionLocal()
+            event_id = random.randint(1, args.events)
+            if crud.create_booking(db, BookingCreate(event_id=event_id, seats=1), 1):
+                with guard:
+                    writes[0] += 1
+            db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    with Timer() as t:
+        for th in threads:
+            th.start()
+        time.sleep(args.duration)
+        stop.set()
+        for th in threads:
+            th.join()
+    engine.dispose()
+    print(f"{label:>8}: reads={len(read_latencies) / t.elapsed:8.1f}/s "
+          f"p50={percentile(read_latencies, 50) * 1000:7.2f}ms p99={percentile(read_latencies, 99) * 1000:7.2f}ms "
+          f"max={max(read_latencies, default=0) * 1000:7.2f}ms  writes={writes[0] / t.elapsed:7.1f}/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Read latency of /events while bookings are written")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    run("legacy", LEGACY_PRAGMAS, args)
+    run("wal", SQLITE_PRAGMAS, args)
+
+if __name__ == "__main__":
+    main()
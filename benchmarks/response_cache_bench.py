@@ -0,0 +1,71 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from common import Timer, percentile, temp_db_url
+
+os.environ["DATABASE_URL"] = temp_db_url("response-cache")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from database import SessionLocal, engine
+from models import Category, Event, User
+from response_cache import response_cache
+import main
+
+def seed(events: int):
+    db = SessionLocal()
+    cat = Category(name="bench")
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    db.add_all([cat, user])
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.add_all(Event(title=f"event {i}", date=start + timedelta(minutes=i), seats=100, category_id=cat.id, owner_id=user.id)
+               for i in range(events))
+    db.commit()
+    db.close()
+
+def measure(client, requests: int, headers=None, invalidate=False):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies = []
+    status = None
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for _ in range(requests):
+            if invalidate:
+                response_cache.invalidate("events")
+            with Timer() as t:
+                r = client.get("/events", params={"limit": 100}, headers=headers)
+            latencies.append(t.elapsed)
+            status = r.status_code
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return latencies, len(statements) / requests, status
+
+def report(name, latencies, queries, status):
+    print(f"{name:12s} status={status} p50={percentile(latencies, 50) * 1000:6.2f}ms "
+          f"p95={percentile(latencies, 95) * 1000:6.2f}ms queries/request={queries:.1f}")
+
+def run():
+    parser = argparse.ArgumentParser(description="Compare uncached, cached and 304 responses for /events")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    seed(args.events)
+    client = TestClient(main.app)
+
+    report("uncached", *measure(client, args.requests, invalidate=True))
+    report("cached", *measure(client, args.requests))
+    etag = client.get("/events", params={"limit": 100}).headers["etag"]
+    latencies, queries, status = measure(client, args.requests, headers={"If-None-Match": etag})
+    report("304", latencies, queries, status)
+    assert status == 304 and queries < 0.05
+    print(response_cache.stats())
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,78 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from common import Timer, temp_db_url
+
+os.environ["DATABASE_URL"] = temp_db_url("reviews")
+
+from sqlalchemy import event
+
+from database import SessionLocal, engine
+from models import Category, Event, Review, User
+import crud
+import main
+
+def seed(reviews: int) -> int:
+    db = SessionLocal()
+    cat = Category(name="bench")
+    db.add(cat)
+    db.add_all(User(username=f"user{i}", password="x", api_key=f"key{i}", role="user") for i in range(reviews))
+    db.flush()
+    past = Event(title="past", date=datetime.utcnow() - timedelta(days=1), seats=0, category_id=cat.id, owner_id=1)
+    db.add(past)
+    db.flush()
+    db.add_all(Review(text="ok", rating=5, user_id=i + 1, event_id=past.id, is_edited=0) for i in range(reviews))
+    db.commit()
+    event_id = past.id
+    db.close()
+    return event_id
+
+def count_queries(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Timer() as t:
+            result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements, t.elapsed
+
+def legacy_event_reviews(db, event_id):
+    return [{
+        "id": review.id,
+        "username": review.user.username if review.user else None,
+        "event_title": review.event.title if review.event else None,
+    } for review in db.query(Review).filter(Review.event_id == event_id).all()]
+
+def run():
+    parser = argparse.ArgumentParser(description="Assert the review endpoints don't issue N+1 queries")
+    parser.add_argument("--reviews", type=int, default=500)
+    args = parser.parse_args()
+    event_id = seed(args.reviews)
+
+    db = SessionLocal()
+    legacy, statements, elapsed = count_queries(lambda: legacy_event_reviews(db, event_id))
+    print(f"legacy lazy loads: {len(statements):5d} queries, {elapsed * 1000:7.1f}ms for {len(legacy)} reviews")
+    db.close()
+
+    db = SessionLocal()
+    page, statements, elapsed = count_queries(
+        lambda: crud.get_event_review_responses(db, event_id, args.reviews, None))
+    print(f"projection:        {len(statements):5d} queries, {elapsed * 1000:7.1f}ms for {len(page)} reviews")
+    assert len(page) == args.reviews and page[0]["username"] and page[0]["event_title"]
+    assert len(statements) == 1, statements
+    db.close()
+
+    db = SessionLocal()
+    _, statements, _ = count_queries(lambda: crud.get_review_response(db, page[0]["id"]))
+    assert len(statements) == 1, statements
+    db.close()
+    print("OK: one query per review page")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,84 @@
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from common import make_session_factory, percentile, temp_db_url
+
+from pydantic import TypeAdapter
+
+from models import Booking, Category, Event, EventRating, User
+from schemas import BookingResponse, EventResponse, UserResponse
+from fast_json import dump_rows
+import crud
+
+def seed(SessionLocal, rows: int):
+    db = SessionLocal()
+    cat = Category(name="bench")
+    db.add(cat)
+    db.flush()
+    db.execute(User.__table__.insert(), [{"username": f"user{i}", "password": "x", "api_key": f"key{i}", "role": "user"}
+                                         for i in range(rows)])
+    start = datetime.utcnow() + timedelta(days=1)
+    db.execute(Event.__table__.insert(), [{"title": f"event {i}", "date": start + timedelta(minutes=i, microseconds=i),
+                                           "seats": 100, "category_id": cat.id, "owner_id": 1} for i in range(rows)])
+    db.execute(EventRating.__table__.insert(), [{"event_id": i, "review_count": 3, "rating_sum": 10.0, "rating_min": 2.0,
+                                                 "rating_max": 4.0, "stars_2": 1, "stars_4": 2, "stars_1": 0,
+                                                 "stars_3": 0, "stars_5": 0} for i in range(1, rows + 1, 2)])
+    db.execute(Booking.__table__.insert(), [{"user_id": 1, "event_id": i % rows + 1, "seats": 1} for i in range(rows)])
+    db.commit()
+    db.close()
+
+def orm_path(adapter):
+    def render(rows):
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return render
+
+PAGES = {
+    "events": (lambda db, limit: crud.get_events(db, 0, limit), lambda db, limit: crud.get_event_rows(db, 0, limit),
+               TypeAdapter(List[EventResponse])),
+    "users": (lambda db, limit: crud.get_users(db, 0, limit), lambda db, limit: crud.get_user_rows(db, 0, limit),
+              TypeAdapter(List[UserResponse])),
+    "bookings": (lambda db, limit: crud.get_user_bookings(db, 1, limit),
+                 lambda db, limit: crud.get_user_booking_rows(db, 1, limit), TypeAdapter(List[BookingResponse])),
+}
+
+def measure(SessionLocal, load, render, limit: int, requests: int):
+    cpu = []
+    for _ in range(requests):
+        db = SessionLocal()
+        start = time.process_time()
+        body = render(load(db, limit))
+        cpu.append(time.process_time() - start)
+        db.close()
+    db = SessionLocal()
+    tracemalloc.start()
+    render(load(db, limit))
+    snapshot = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.close()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return body, cpu, peak, blocks
+
+def run():
+    parser = argparse.ArgumentParser(description="ORM + Pydantic list pages versus Core rows serialized with orjson")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    engine, SessionLocal = make_session_factory(temp_db_url("projection"))
+    seed(SessionLocal, args.rows)
+    for name, (orm_load, row_load, adapter) in PAGES.items():
+        for limit in args.limits:
+            results = {}
+            for label, load, render in (("orm", orm_load, orm_path(adapter)), ("core", row_load, dump_rows)):
+                body, cpu, peak, blocks = measure(SessionLocal, load, render, limit, args.requests)
+                results[label] = body
+                print(f"{name:8s} limit={limit:5d} {label:4s} cpu p50={percentile(cpu, 50) * 1000:7.2f}ms "
+                      f"p95={percentile(cpu, 95) * 1000:7.2f}ms peak={peak / 1024:8.1f}KiB live blocks={blocks}")
+            assert results["orm"] == results["core"], f"{name}: responses differ"
+
+if __name__ == "__main__":
+    run()
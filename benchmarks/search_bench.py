@@ -0,0 +1,65 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from common import Timer, make_session_factory, temp_db_url
+
+from models import Category, Event, User
+import search
+
+WORDS = ["rock", "jazz", "opera", "festival", "concert", "theatre", "stand", "comedy", "lecture", "python",
+         "marathon", "exhibition", "cinema", "ballet", "workshop", "quiz", "poetry", "gala", "derby", "summit"]
+
+def seed(engine, SessionLocal, events: int):
+    db = SessionLocal()
+    user = User(username="bench", password="x", api_key="bench", role="user")
+    db.add(user)
+    db.add_all(Category(name=f"category {i}") for i in range(10))
+    db.commit()
+    rng = random.Random(42)
+    start = datetime.utcnow()
+    batch = []
+    with engine.begin() as conn:
+        for i in range(events):
+            batch.append({
+                "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+                "date": start + timedelta(minutes=i),
+                "seats": 100,
+                "category_id": rng.randint(1, 10),
+                "owner_id": user.id,
+            })
+            if len(batch) == 10000:
+                conn.execute(Event.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Event.__table__.insert(), batch)
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 search against the LIKE scan")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine, SessionLocal = make_session_factory(temp_db_url("search"))
+    with Timer() as t:
+        seed(engine, SessionLocal, args.events)
+    print(f"seeded {args.events} events in {t.elapsed:.1f}s")
+    with Timer() as t:
+        search.init_search(engine)
+    print(f"built FTS index in {t.elapsed:.1f}s")
+
+    db = SessionLocal()
+    for q in ["jazz", "fest", "opera gala", "ballet 99"]:
+        with Timer() as like:
+            for _ in range(args.repeat):
+                like_rows = db.query(Event).filter(Event.title.contains(q)).all()
+        with Timer() as fts:
+            for _ in range(args.repeat):
+                fts_rows = search.search_events(db, q, limit=20, category_id=3)
+        print(f"{q!r:>14}: LIKE {like.elapsed / args.repeat * 1000:9.2f}ms ({len(like_rows)} rows)   "
+              f"FTS5 {fts.elapsed / args.repeat * 1000:8.2f}ms ({len(fts_rows)} rows, ranked, category filter)")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+from common import ROOT, asgi_load, http_load, percentile, wait_for_port
+
+SCALES = {
+    "small": {"users": 1_000, "categories": 20, "events": 10_000, "bookings": 100_000, "reviews": 20_000},
+    "medium": {"users": 10_000, "categories": 50, "events": 100_000, "bookings": 1_000_000, "reviews": 200_000},
+    "full": {"users": 100_000, "categories": 100, "events": 1_000_000, "bookings": 10_000_000, "reviews": 2_000_000},
+}
+WORDS = ["rock", "jazz", "opera", "festival", "concert", "theatre", "comedy", "ballet", "symphony", "football",
+         "hockey", "lecture", "exhibition", "workshop", "party", "cinema", "quiz", "marathon", "poetry", "circus"]
+SCENARIOS = ("browse", "search", "reviews", "book", "login", "mixed")
+MIXED = (("browse", 60), ("search", 15), ("reviews", 15), ("book", 10))
+PAST_SHARE = 0.2
+PASSWORD = "bench-password"
+TOKEN_USERS = 200
+CHUNK = 50_000
+QUERY_TOLERANCE = 0.1
+METRICS_TOKEN = secrets.token_hex(16)
+METRICS_HEADERS = {"Authorization": f"Bearer {METRICS_TOKEN}"}
+BASELINE = Path(__file__).with_name("baseline.json")
+
+def chunks(rows, size: int = CHUNK):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def insert_rows(conn, table, rows) -> int:
+    count = 0
+    for chunk in chunks(rows):
+        conn.execute(table.insert(), chunk)
+        count += len(chunk)
+    return count
+
+def past_events(sizes: dict) -> int:
+    return max(int(sizes["events"] * PAST_SHARE), 1)
+
+def reviewed_events(sizes: dict) -> int:
+    return max(min(past_events(sizes), sizes["reviews"] // sizes["users"]), 1)
+
+def seed(path: Path, sizes: dict, rounds: int, seed_value: int):
+    from passlib.context import CryptContext
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from database import Base, create_db_engine
+    from models import Booking, Category, Event, Review, User
+    import migrations
+    import ratings
+    import search
+
+    rng = random.Random(seed_value)
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    migrations.migrate(engine)
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(PASSWORD)
+    now = datetime.utcnow()
+    users, events, past = sizes["users"], sizes["events"], past_events(sizes)
+
+    def event_row(i: int) -> dict:
+        if i < past:
+            date, seats = now - timedelta(days=1 + i % 365, minutes=i), 100
+        else:
+            date, seats = now + timedelta(days=1, minutes=i), 1_000_000
+        title = f"{WORDS[i % len(WORDS)]} {rng.choice(WORDS)} {i}"
+        return {"title": title, "date": date, "seats": seats,
+                "category_id": i % sizes["categories"] + 1, "owner_id": i % users + 1}
+
+    with engine.begin() as conn:
+        insert_rows(conn, User.__table__, ({"username": f"user{i}", "password": hashed, "api_key": f"key{i}",
+                                            "role": "user"} for i in range(users)))
+        insert_rows(conn, Category.__table__, ({"name": f"category {i}"} for i in range(sizes["categories"])))
+        insert_rows(conn, Event.__table__, (event_row(i) for i in range(events)))
+        insert_rows(conn, Booking.__table__, ({"user_id": rng.randint(1, users), "event_id": rng.randint(1, events),
+                                               "seats": rng.randint(1, 4)} for _ in range(sizes["bookings"])))
+        insert_rows(conn, Review.__table__, ({"user_id": i % users + 1, "event_id": (i // users) % past + 1,
+                                              "text": f"review {i}", "rating": rng.randint(1, 5), "is_edited": 0}
+                                             for i in range(min(sizes["reviews"], users * past))))
+    search.init_search(engine)
+    with Session(engine) as db:
+        ratings.rebuild_ratings(db)
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    engine.dispose()
+
+def prepare_database(args, sizes: dict, target: Path) -> Path:
+    source = Path(args.db or Path(tempfile.gettempdir()) / f"booking-bench-{args.scale}.db")
+    meta_path = source.with_suffix(".json")
+    meta = {"sizes": sizes, "rounds": args.rounds, "seed": args.seed}
+    if args.reseed or not source.exists() or not meta_path.exists() or json.loads(meta_path.read_text()) != meta:
+        for stale in (source, Path(f"{source}-wal"), Path(f"{source}-shm")):
+            stale.unlink(missing_ok=True)
+        started = time.perf_counter()
+        seed(source, sizes, args.rounds, args.seed)
+        meta_path.write_text(json.dumps(meta))
+        print(f"seeded {source} in {time.perf_counter() - started:.1f}s: {sizes}")
+    shutil.copyfile(source, target)
+    return target
+
+def working_copy() -> Path:
+    return Path(tempfile.mkdtemp(prefix="suite-")) / "database.db"
+
+def signed_headers(token: str, api_key: str, method: str, path: str, body: bytes) -> dict:
+    timestamp = str(int(time.time()))
+    nonce = secrets.token_hex(16)
+    body_hash = hashlib.sha256(body).hexdigest() if body else ""
+    message = f"{method}|{path}||{body_hash}|{timestamp}|{nonce}"
+    signature = hmac.new(api_key.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json",
+            "X-Signature": signature, "X-Timestamp": timestamp, "X-Nonce": nonce}
+
+class Workload:
+    def __init__(self, sizes: dict, seed_value: int):
+        from auth import create_access_token
+        self.sizes = sizes
+        self.rng = random.Random(seed_value)
+        self.past = past_events(sizes)
+        self.reviewed = reviewed_events(sizes)
+        self.tokens = [(create_access_token({"sub": str(i + 1)}), f"key{i}")
+                       for i in range(min(sizes["users"], TOKEN_USERS))]
+        self.mixed_plan = [name for name, weight in MIXED for _ in range(weight)]
+
+    def browse(self, i: int):
+        if i % 5 == 0:
+            return "/events?limit=20"
+        return f"/events/{self.rng.randint(1, self.sizes['events'])}"
+
+    def search(self, i: int):
+        return f"/events/search?q={self.rng.choice(WORDS)}&limit=20"
+
+    def reviews(self, i: int):
+        return f"/reviews/event/{self.rng.randint(1, self.reviewed)}?limit=20"
+
+    def book(self, i: int):
+        token, api_key = self.rng.choice(self.tokens)
+        body = json.dumps({"event_id": self.rng.randint(self.past + 1, self.sizes["events"]), "seats": 1}).encode()
+        return "POST", "/bookings", body, signed_headers(token, api_key, "POST", "/bookings", body)
+
+    def login(self, i: int):
+        body = f"username=user{self.rng.randrange(self.sizes['users'])}&password={PASSWORD}".encode()
+        return "POST", "/auth/login", body, {"Content-Type": "application/x-www-form-urlencoded"}
+
+    def mixed(self, i: int):
+        return getattr(self, self.rng.choice(self.mixed_plan))(i)
+
+def query_totals(metrics_text: str) -> tuple:
+    queries = requests = 0.0
+    for line in metrics_text.splitlines():
+        if 'route="/metrics"' in line:
+            continue
+        if line.startswith("http_request_db_queries_sum"):
+            queries += float(line.rsplit(" ", 1)[1])
+        elif line.startswith("http_request_db_queries_count"):
+            requests += float(line.rsplit(" ", 1)[1])
+    return queries, requests
+
+async def measure(name: str, load, scrape, workload: Workload, args) -> dict:
+    requests = getattr(workload, name)
+    concurrency = args.login_concurrency if name == "login" else args.concurrency
+    if args.warmup:
+        await load(requests, concurrency, args.warmup)
+    before = query_totals(await scrape())
+    latencies, errors, elapsed = await load(requests, concurrency, args.duration)
+    after = query_totals(await scrape())
+    handled = after[1] - before[1]
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+        "queries": round((after[0] - before[0]) / handled, 2) if handled else 0.0,
+    }
+
+async def run_inprocess(scenarios, workload: Workload, args) -> dict:
+    import httpx
+    import main
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        async def load(requests, concurrency, duration):
+            return await asgi_load(client, requests, concurrency, duration)
+
+        async def scrape():
+            return (await client.get("/metrics", headers=METRICS_HEADERS)).text
+
+        for name in scenarios:
+            results[name] = await measure(name, load, scrape, workload, args)
+    return results
+
+def run_uvicorn(scenarios, workload: Workload, database: Path, args) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", DB_ASYNC="1" if args.async_db else "0",
+               METRICS_ENABLED="1", METRICS_TOKEN=METRICS_TOKEN, PYTHONPATH=str(ROOT))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=database.parent, env=env,
+    )
+    results = {}
+    try:
+        wait_for_port("127.0.0.1", args.port)
+
+        async def load(requests, concurrency, duration):
+            return await http_load("127.0.0.1", args.port, requests, concurrency, duration)
+
+        async def scrape():
+            metrics_request = urllib.request.Request(f"http://127.0.0.1:{args.port}/metrics", headers=METRICS_HEADERS)
+            return await asyncio.to_thread(lambda: urllib.request.urlopen(metrics_request).read().decode())
+
+        for name in scenarios:
+            results[name] = asyncio.run(measure(name, load, scrape, workload, args))
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+def regressions(key: str, current: dict, base: dict, tolerance: float) -> list:
+    found = []
+    if current["rps"] < base["rps"] * (1 - tolerance):
+        found.append(f"throughput {base['rps']} -> {current['rps']} req/s")
+    if current["p95"] > base["p95"] * (1 + tolerance):
+        found.append(f"p95 {base['p95']} -> {current['p95']} ms")
+    if current["queries"] > base["queries"] * (1 + QUERY_TOLERANCE) + 0.05:
+        found.append(f"queries/request {base['queries']} -> {current['queries']}")
+    return [f"{key}: {problem}" for problem in found]
+
+def change(current: float, base: float) -> str:
+    return f"{(current - base) / base * 100:+6.1f}%" if base else "      "
+
+def report(results: dict, baseline: dict, tolerance: float) -> list:
+    print(f"{'scenario':20s} {'req/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>7s} "
+          f"{'queries':>8s}  vs baseline (req/s, p95)")
+    found = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        versus = f"{change(current['rps'], base['rps'])} {change(current['p95'], base['p95'])}" if base else "-"
+        print(f"{key:20s} {current['rps']:9.1f} {current['p50']:8.2f} {current['p95']:8.2f} {current['p99']:8.2f} "
+              f"{current['errors']:7d} {current['queries']:8.2f}  {versus}")
+        if base:
+            found += regressions(key, current, base, tolerance)
+    return found
+
+def run():
+    parser = argparse.ArgumentParser(description="Seeded load-test suite for the booking API with baseline comparison")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--transport", choices=("inprocess", "uvicorn", "both"), default="inprocess")
+    parser.add_argument("--async-db", action="store_true", help="run the app with DB_ASYNC=1")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="seeded database to reuse (default: one per scale in the temp directory)")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--check", action="store_true", help="exit with 1 when a scenario regressed")
+    args = parser.parse_args()
+
+    sizes = SCALES[args.scale]
+    database = working_copy()
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["DB_ASYNC"] = "1" if args.async_db else "0"
+    os.environ["METRICS_ENABLED"] = "1"
+    os.environ["METRICS_TOKEN"] = METRICS_TOKEN
+    prepare_database(args, sizes, database)
+    workload = Workload(sizes, args.seed)
+
+    results = {}
+    if args.transport in ("inprocess", "both"):
+        for name, result in asyncio.run(run_inprocess(args.scenarios, workload, args)).items():
+            results[f"inprocess/{name}"] = result
+        import hashing
+        hashing.shutdown()
+    if args.transport in ("uvicorn", "both"):
+        served = prepare_database(args, sizes, working_copy())
+        for name, result in run_uvicorn(args.scenarios, workload, served, args).items():
+            results[f"uvicorn/{name}"] = result
+
+    mode = "async" if args.async_db else "sync"
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline = stored.get("results", {}) if (stored.get("scale"), stored.get("mode")) == (args.scale, mode) else {}
+    if stored and not baseline:
+        print(f"baseline {args.baseline} was recorded for {stored.get('scale')}/{stored.get('mode')}, not compared")
+    found = report(results, baseline, args.tolerance)
+    for problem in found:
+        print(f"REGRESSION {problem}")
+    if args.save_baseline:
+        merged = dict(baseline, **results)
+        args.baseline.write_text(json.dumps({"scale": args.scale, "mode": mode, "concurrency": args.concurrency,
+                                             "duration": args.duration, "results": merged}, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+    return 1 if found and args.check else 0
+
+if __name__ == "__main__":
+    sys.exit(run())
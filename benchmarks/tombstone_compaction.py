@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+from common import make_session_factory, percentile, temp_db_url
+
+from sqlalchemy import func, select
+
+from models import ArchivedBooking, Booking, Category, Event, User
+from reservations import event_lock, release_seats
+from holds import drain_waitlist
+from live import seat_hub
+from response_cache import response_cache
+from schemas import BookingCreate
+import compaction
+import crud
+
+def seed(SessionLocal, events: int, bookings: int, tombstones: int):
+    db = SessionLocal()
+    db.add(User(username="bench", password="x", api_key="bench", role="user"))
+    db.add(Category(name="bench"))
+    db.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.execute(Event.__table__.insert(), [{"title": f"event {i}", "date": start, "seats": 10 ** 6,
+                                           "category_id": 1, "owner_id": 1} for i in range(events)])
+    deleted_at = datetime.utcnow() - timedelta(days=1)
+    db.execute(Booking.__table__.insert(), [{"user_id": 1, "event_id": 1 + i % events, "seats": 1,
+                                             "deleted_at": deleted_at if i < tombstones else None}
+                                            for i in range(tombstones + bookings)])
+    db.commit()
+    db.close()
+
+def hard_cancel(db, booking_id: int):
+    booking = db.query(Booking).filter(Booking.id == booking_id, Booking.user_id == 1).first()
+    db.connection()
+    with event_lock(booking.event_id):
+        release_seats(db, booking.event_id, booking.seats)
+        drain_waitlist(db, booking.event_id)
+        db.delete(booking)
+        db.commit()
+    response_cache.invalidate("events")
+    seat_hub.publish(booking.event_id)
+
+def soft_cancel(db, booking_id: int):
+    crud.cancel_booking(db, booking_id, 1)
+
+def measure_cancel(label: str, cancel, bookings: int):
+    engine, SessionLocal = make_session_factory(temp_db_url(f"cancel-{label}"))
+    seed(SessionLocal, 10, bookings, 0)
+    latencies = []
+    for booking_id in range(1, bookings + 1):
+        db = SessionLocal()
+        start = time.perf_counter()
+        cancel(db, booking_id)
+        latencies.append(time.perf_counter() - start)
+        db.close()
+    engine.dispose()
+    print(f"  {label:6s} p50={percentile(latencies, 50) * 1000:.2f}ms p95={percentile(latencies, 95) * 1000:.2f}ms")
+
+def book_while(SessionLocal, events: int, think: float, done: threading.Event, latencies: list):
+    i = 0
+    while not done.is_set():
+        db = SessionLocal()
+        start = time.perf_counter()
+        crud.create_booking(db, BookingCreate(event_id=1 + i % events, seats=1), 1)
+        latencies.append(time.perf_counter() - start)
+        db.close()
+        i += 1
+        time.sleep(think)
+
+def one_batch(SessionLocal, limit: int, done: threading.Event):
+    compaction.compact(SessionLocal, 0, limit)
+
+def throttled(SessionLocal, limit: int, done: threading.Event):
+    async def compact_until_done():
+        task = asyncio.ensure_future(compaction.compact_when_idle(SessionLocal, 0))
+        while not task.done() and not done.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(compact_until_done())
+
+def measure_compaction(label: str, compact, tombstones: int, writers: int, think: float, duration: float):
+    engine, SessionLocal = make_session_factory(temp_db_url(f"compact-{label}"))
+    seed(SessionLocal, 100, 1000, tombstones)
+    done = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=book_while, args=(SessionLocal, 100, think, done, latencies))
+               for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    start = time.perf_counter()
+    finished = []
+
+    def compactor():
+        compact(SessionLocal, tombstones, done)
+        finished.append(time.perf_counter() - start)
+
+    worker = threading.Thread(target=compactor)
+    if compact is not None:
+        worker.start()
+    time.sleep(duration)
+    done.set()
+    for thread in threads:
+        thread.join()
+    if compact is not None:
+        worker.join()
+    with SessionLocal() as db:
+        archived = db.scalar(select(func.count(ArchivedBooking.id)))
+    engine.dispose()
+    took = f"in {finished[0]:.2f}s" if compact is not None and archived == tombstones else ""
+    print(f"  {label:10s} bookings={len(latencies):6d} p50={percentile(latencies, 50) * 1000:6.2f}ms "
+          f"p95={percentile(latencies, 95) * 1000:6.2f}ms max={max(latencies) * 1000:7.1f}ms "
+          f"archived={archived} {took}")
+
+def run():
+    parser = argparse.ArgumentParser(description="Soft-delete cancellation and tombstone compaction under booking load")
+    parser.add_argument("--cancels", type=int, default=2000)
+    parser.add_argument("--tombstones", type=int, default=200000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--think", type=float, default=0.005, help="seconds each writer waits between bookings")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of booking load per run")
+    args = parser.parse_args()
+    print(f"cancel {args.cancels} bookings")
+    measure_cancel("delete", hard_cancel, args.cancels)
+    measure_cancel("soft", soft_cancel, args.cancels)
+    print(f"{args.writers} booking writers while {args.tombstones} tombstoned bookings are archived")
+    for label, compact in (("none", None), ("one batch", one_batch), ("throttled", throttled)):
+        measure_compaction(label, compact, args.tombstones, args.writers, args.think, args.duration)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,281 @@
+import codecs
+import csv
+import io
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Booking, Category, Event, User
+from holds import waitlisted_events
+from reservations import reserve_seats_many
+from response_cache import response_cache
+from live import seat_hub
+from categories import category_registry
+from schemas import BookingImport, EventCreate
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+BULK_RETRIES = 3
+FORMATS = ("ndjson", "csv")
+
+EXPORT_COLUMNS = {
+    "events": ("id", "title", "date", "seats", "category_id", "category_name", "owner_id"),
+    "bookings": ("id", "event_id", "user_id", "seats"),
+}
+
+class ImportReport:
+    def __init__(self, max_errors: int = BULK_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "elapsed": round(time.perf_counter() - self.started, 3),
+        }
+
+class RecordParser:
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        self.fmt = fmt
+        self.line_no = 0
+        self.header = None
+        self._pending = []
+        self._pending_start = 0
+        self._quotes = 0
+
+    def feed(self, line: str):
+        self.line_no += 1
+        if self.fmt == "ndjson":
+            if not line.strip():
+                return None
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return self.line_no, "Invalid JSON"
+            return self.line_no, record if isinstance(record, dict) else "Expected a JSON object"
+
+        if not self._pending:
+            self._pending_start = self.line_no
+        self._pending.append(line)
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return None
+        text, self._pending, self._quotes = "".join(self._pending), [], 0
+        if not text.strip():
+            return None
+        row = next(csv.reader([text]))
+        if self.header is None:
+            self.header = [name.strip() for name in row]
+            return None
+        if len(row) != len(self.header):
+            return self._pending_start, f"Expected {len(self.header)} columns, got {len(row)}"
+        return self._pending_start, {k: v for k, v in zip(self.header, row) if v != ""}
+
+    def finish(self):
+        if self._pending:
+            self._pending, self._quotes = [], 0
+            return self._pending_start, "Unterminated quoted field"
+        return None
+
+def read_batches(lines: Iterable[str], fmt: str, batch_size: int = BULK_BATCH_SIZE) -> Iterator[list]:
+    parser = RecordParser(fmt)
+    batch = []
+    for line in lines:
+        item = parser.feed(line)
+        if item is not None:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    tail = parser.finish()
+    if tail is not None:
+        batch.append(tail)
+    if batch:
+        yield batch
+
+async def read_batches_async(chunks, fmt: str, batch_size: int = BULK_BATCH_SIZE):
+    parser = RecordParser(fmt)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    batch = []
+    buffer = ""
+    async for chunk in chunks:
+        *lines, buffer = (buffer + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            item = parser.feed(line + "\n")
+            if item is not None:
+                batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    buffer += decoder.decode(b"", final=True)
+    for item in (parser.feed(buffer) if buffer else None, parser.finish()):
+        if item is not None:
+            batch.append(item)
+    if batch:
+        yield batch
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+def parse_rows(batch: list, schema, report: ImportReport) -> list:
+    rows = []
+    for line, record in batch:
+        if isinstance(record, str):
+            report.error(line, record)
+            continue
+        try:
+            rows.append((line, schema.model_validate(record)))
+        except ValidationError as exc:
+            report.error(line, validation_message(exc))
+    return rows
+
+def import_events(db: Session, batch: list, owner_id: int, report: ImportReport) -> ImportReport:
+    rows = parse_rows(batch, EventCreate, report)
+    values = []
+    for line, row in rows:
+        category = category_registry.find(db, row.category_name)
+        if category is None:
+            report.error(line, f"Category not found: {row.category_name}")
+        elif row.seats < 0:
+            report.error(line, "seats: must not be negative")
+        else:
+            values.append({"title": row.title, "date": row.date, "seats": row.seats,
+                           "category_id": category.id, "owner_id": owner_id})
+    if values:
+        db.execute(Event.__table__.insert(), values)
+        db.commit()
+        report.inserted += len(values)
+        response_cache.invalidate("events")
+    return report
+
+def _grant_bookings(db: Session, rows: list):
+    event_ids = {row.event_id for _, row in rows}
+    available = dict(db.execute(
+        select(Event.id, Event.seats).where(Event.id.in_(event_ids), Event.date > datetime.utcnow(),
+                                            Event.deleted_at.is_(None))
+    ).all())
+    queued = waitlisted_events(db, available)
+    granted, failures, taken = [], [], defaultdict(int)
+    for line, row in rows:
+        if row.event_id not in available:
+            failures.append((line, "Event not found or already started"))
+        elif row.event_id in queued:
+            failures.append((line, "Seats are given out through the waitlist"))
+        elif available[row.event_id] - taken[row.event_id] < row.seats:
+            failures.append((line, "Not enough seats"))
+        else:
+            taken[row.event_id] += row.seats
+            granted.append((line, row))
+    if taken and not reserve_seats_many(db, taken):
+        db.rollback()
+        return None, None
+    return granted, failures
+
+def import_bookings(db: Session, batch: list, user_id: int, is_admin: bool, report: ImportReport) -> ImportReport:
+    rows = []
+    for line, row in parse_rows(batch, BookingImport, report):
+        if row.seats <= 0:
+            report.error(line, "seats: must be positive")
+        elif row.user_id is not None and row.user_id != user_id and not is_admin:
+            report.error(line, "Not authorized to book for another user")
+        else:
+            rows.append((line, row))
+    owners = {row.user_id for _, row in rows if row.user_id is not None}
+    if owners:
+        known = set(db.execute(select(User.id).where(User.id.in_(owners))).scalars())
+        missing = [(line, row) for line, row in rows if row.user_id is not None and row.user_id not in known]
+        for line, row in missing:
+            report.error(line, f"User not found: {row.user_id}")
+        rows = [(line, row) for line, row in rows if row.user_id is None or row.user_id in known]
+    if not rows:
+        return report
+
+    for _ in range(BULK_RETRIES):
+        granted, failures = _grant_bookings(db, rows)
+        if granted is not None:
+            break
+    else:
+        for line, _ in rows:
+            report.error(line, "Seat availability changed during import, retry")
+        return report
+
+    for line, message in failures:
+        report.error(line, message)
+    if granted:
+        db.execute(Booking.__table__.insert(), [
+            {"event_id": row.event_id, "seats": row.seats, "user_id": row.user_id or user_id} for _, row in granted
+        ])
+    db.commit()
+    report.inserted += len(granted)
+    if granted:
+        response_cache.invalidate("events")
+        seat_hub.publish(*{row.event_id for _, row in granted})
+    return report
+
+def export_query(kind: str, user_id: Optional[int] = None):
+    if kind == "events":
+        return (
+            select(Event.id, Event.title, Event.date, Event.seats, Event.category_id,
+                   Category.name.label("category_name"), Event.owner_id)
+            .outerjoin(Category, Category.id == Event.category_id)
+            .where(Event.deleted_at.is_(None))
+            .order_by(Event.id)
+        )
+    if kind == "bookings":
+        query = (
+            select(Booking.id, Booking.event_id, Booking.user_id, Booking.seats)
+            .where(Booking.deleted_at.is_(None))
+            .order_by(Booking.id)
+        )
+        return query.where(Booking.user_id == user_id) if user_id is not None else query
+    raise ValueError(f"Unknown export: {kind}")
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def export_rows(kind: str, fmt: str, user_id: Optional[int] = None, session_factory=SessionLocal,
+                chunk_size: int = 1000) -> Iterator[str]:
+    columns = EXPORT_COLUMNS[kind]
+    db = session_factory()
+    try:
+        result = db.execute(export_query(kind, user_id).execution_options(yield_per=chunk_size))
+        if fmt == "csv":
+            out = io.StringIO()
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows([_export_value(v) for v in row] for row in rows)
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+            if out.tell():
+                yield out.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, map(_export_value, row))), ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+    finally:
+        db.close()
+
+def media_type(fmt: str) -> str:
+    return "text/csv" if fmt == "csv" else "application/x-ndjson"
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import CacheVersion, Category
+
+CATEGORY_VERSION_CHECK = float(os.getenv("CATEGORY_VERSION_CHECK", "1"))
+REGISTRY_NAME = "categories"
+
+def read_version(db: Session, name: str = REGISTRY_NAME) -> int:
+    return db.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar() or 0
+
+def bump_version(db: Session, name: str = REGISTRY_NAME):
+    bumped = db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not bumped:
+        db.add(CacheVersion(name=name, version=1))
+
+class CategoryEntry:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+class CategoryRegistry:
+    def __init__(self, check_interval: float = CATEGORY_VERSION_CHECK):
+        self.check_interval = check_interval
+        self.version = None
+        self.checked_at = 0.0
+        self.entries = []
+        self.by_id = {}
+        self.by_name = {}
+        self.loads = 0
+        self.checks = 0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        version = read_version(db)
+        entries = [CategoryEntry(id, name) for id, name in
+                   db.execute(select(Category.id, Category.name).order_by(Category.id))]
+        by_name = defaultdict(list)
+        for entry in entries:
+            by_name[entry.name].append(entry)
+        with self._lock:
+            self.entries = entries
+            self.by_id = {entry.id: entry for entry in entries}
+            self.by_name = dict(by_name)
+            self.version = version
+            self.checked_at = time.monotonic()
+            self.loads += 1
+
+    def current(self, db: Session) -> "CategoryRegistry":
+        if self.version is None:
+            self.load(db)
+        elif time.monotonic() - self.checked_at >= self.check_interval:
+            self.checks += 1
+            if read_version(db) != self.version:
+                self.load(db)
+            else:
+                self.checked_at = time.monotonic()
+        return self
+
+    def invalidate(self):
+        self.version = None
+
+    def all(self, db: Session) -> List[CategoryEntry]:
+        return self.current(db).entries
+
+    def get(self, db: Session, category_id: int) -> Optional[CategoryEntry]:
+        return self.current(db).by_id.get(category_id)
+
+    def find(self, db: Session, name: str) -> Optional[CategoryEntry]:
+        entries = self.current(db).by_name.get(name)
+        return entries[0] if entries else None
+
+    def ids(self, db: Session, names: List[str]) -> List[int]:
+        by_name = self.current(db).by_name
+        return [entry.id for name in dict.fromkeys(names) for entry in by_name.get(name, ())]
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "version": self.version, "loads": self.loads, "checks": self.checks}
+
+category_registry = CategoryRegistry()
+
+def load_registry(session_factory=SessionLocal):
+    with session_factory() as db:
+        category_registry.load(db)
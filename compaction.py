@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import ArchivedBooking, ArchivedEvent, ArchivedReview, Booking, Event, EventRating, Review, SeatHold
+from reservations import busy_stripes
+
+COMPACT_AFTER = float(os.getenv("COMPACT_AFTER", "3600"))
+COMPACT_INTERVAL = float(os.getenv("COMPACT_INTERVAL", "60"))
+COMPACT_BATCH = int(os.getenv("COMPACT_BATCH", "200"))
+COMPACT_PAUSE = float(os.getenv("COMPACT_PAUSE", "0.05"))
+COMPACT_MAX_DEFER = float(os.getenv("COMPACT_MAX_DEFER", "1"))
+
+ARCHIVES = ((Booking, ArchivedBooking), (Review, ArchivedReview), (Event, ArchivedEvent))
+
+logger = logging.getLogger(__name__)
+
+archived = {model.__tablename__: 0 for model, _ in ARCHIVES}
+deferrals = 0
+
+def archive_rows(db: Session, model, archive, condition, now: datetime) -> int:
+    names = [column.name for column in archive.__table__.columns if column.name != "archived_at"]
+    rows = select(*(model.__table__.c[name] for name in names), literal(now)).where(condition)
+    db.execute(insert(archive).from_select(names + ["archived_at"], rows))
+    return db.execute(delete(model).where(condition).execution_options(synchronize_session=False)).rowcount
+
+def archive_events(db: Session, event_ids, now: datetime) -> dict:
+    moved = {}
+    for child, child_archive in ARCHIVES[:2]:
+        moved[child.__tablename__] = archive_rows(db, child, child_archive, child.event_id.in_(event_ids), now)
+    for child in (EventRating, SeatHold):
+        db.execute(delete(child).where(child.event_id.in_(event_ids)).execution_options(synchronize_session=False))
+    moved[Event.__tablename__] = archive_rows(db, Event, ArchivedEvent, Event.id.in_(event_ids), now)
+    return moved
+
+def compact_batch(db: Session, model, archive, cutoff: datetime, limit: int = COMPACT_BATCH) -> int:
+    ids = list(db.scalars(
+        select(model.id).where(model.deleted_at <= cutoff).order_by(model.deleted_at).limit(limit)
+    ))
+    if not ids:
+        return 0
+    now = datetime.utcnow()
+    if model is Event:
+        moved = archive_events(db, ids, now)
+    else:
+        moved = {model.__tablename__: archive_rows(db, model, archive, model.id.in_(ids), now)}
+    db.commit()
+    for name, count in moved.items():
+        archived[name] += count
+    return len(ids)
+
+def compact_step(model, archive, cutoff: datetime, limit: int = COMPACT_BATCH, session_factory=SessionLocal) -> int:
+    with session_factory() as db:
+        return compact_batch(db, model, archive, cutoff, limit)
+
+def compact(session_factory=SessionLocal, older_than: float = COMPACT_AFTER, limit: int = COMPACT_BATCH) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    total = 0
+    for model, archive in ARCHIVES:
+        moved = limit
+        while moved == limit:
+            moved = compact_step(model, archive, cutoff, limit, session_factory)
+            total += moved
+    return total
+
+async def wait_for_idle(pause: float = COMPACT_PAUSE, max_defer: float = COMPACT_MAX_DEFER):
+    global deferrals
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_defer
+    while busy_stripes() and loop.time() < deadline:
+        deferrals += 1
+        await asyncio.sleep(pause)
+
+async def compact_when_idle(session_factory=SessionLocal, older_than: float = COMPACT_AFTER,
+                            limit: int = COMPACT_BATCH, pause: float = COMPACT_PAUSE) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    total = 0
+    for model, archive in ARCHIVES:
+        moved = limit
+        while moved == limit:
+            await wait_for_idle(pause)
+            moved = await run_in_threadpool(compact_step, model, archive, cutoff, limit, session_factory)
+            total += moved
+            await asyncio.sleep(pause)
+    return total
+
+def stats() -> dict:
+    return {"archived": dict(archived), "deferrals": deferrals}
+
+async def run_compactor():
+    while True:
+        try:
+            await compact_when_idle()
+        except Exception:
+            logger.exception("Tombstone compaction failed")
+        await asyncio.sleep(COMPACT_INTERVAL)
+
+_compactor = None
+
+async def start_compactor():
+    global _compactor
+    if COMPACT_INTERVAL > 0:
+        _compactor = asyncio.get_running_loop().create_task(run_compactor())
+
+async def stop_compactor():
+    global _compactor
+    if _compactor is not None:
+        _compactor.cancel()
+        _compactor = None
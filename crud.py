@@ -1,22 +1,42 @@
-from sqlalchemy.orm import Session
-from models import User, Event, Booking, Review, Category
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+from sqlalchemy import case, delete, func, select, tuple_, union, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from models import User, Event, Booking, Review, Category, EventRating, SeatHold, ArchivedBooking
 from schemas import *
-from passlib.context import CryptContext
+from hashing import hash_password_sync
+from cache import user_cache
+from response_cache import response_cache
+from reservations import event_lock, events_lock, reserve_seats, reserve_seats_many, release_seats, release_seats_many
+from ratings import STARS, add_rating, remove_rating
+from holds import HELD, drain_waitlist, drain_waitlists, queue_empty, schedule as schedule_holds, waitlisted_events
+from live import seat_hub
+from categories import bump_version, category_registry
+from compaction import archive_events
 import secrets
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    query = db.query(User).order_by(User.id)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    return query.offset(skip).limit(limit).all()
+
+def get_user_rows(db: Session, skip: int = 0, limit: int = 100, after_id: int = None):
+    query = select(User.id, User.username, User.api_key, User.role).order_by(User.id)
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    return db.execute(query.offset(skip).limit(limit)).all()
 
-def create_user(db: Session, user: UserCreate):
-    hashed = pwd_context.hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: str = None):
+    hashed = hashed_password or hash_password_sync(user.password)
     api_key = secrets.token_hex(32)
     role = user.role if user.role in ("admin", "user") else "user"
     db_user = User(username=user.username, password=hashed, api_key=api_key, role=role)
@@ -25,53 +45,148 @@ def create_user(db: Session, user: UserCreate):
     db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, data: UserUpdate):
+def update_user(db: Session, user_id: int, data: UserUpdate, hashed_password: str = None):
     db_user = get_user(db, user_id)
     if not db_user:
         return None
     if data.username:
         db_user.username = data.username
     if data.password:
-        db_user.password = pwd_context.hash(data.password)
+        db_user.password = hashed_password or hash_password_sync(data.password)
     if data.role in ("admin", "user"):
         db_user.role = data.role
     db.commit()
+    user_cache.invalidate(user_id)
     db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int):
+DELETE_FAILURES = {
+    "no_owner": "No user to take over the owned events",
+    "in_use": "Category has events",
+}
+
+OWNED_EVENT_POLICIES = ("reassign", "cascade")
+
+def tombstone_events(db: Session, event_ids, now: datetime):
+    for model in (Booking, Review):
+        db.execute(update(model).where(model.event_id.in_(event_ids), model.deleted_at.is_(None))
+                   .values(deleted_at=now).execution_options(synchronize_session=False))
+    db.execute(delete(SeatHold).where(SeatHold.event_id.in_(event_ids)).execution_options(synchronize_session=False))
+    db.execute(update(Event).where(Event.id.in_(event_ids), Event.deleted_at.is_(None))
+               .values(deleted_at=now).execution_options(synchronize_session=False))
+
+def release_user_seats(db: Session, user_id: int, now: datetime) -> dict:
+    released = defaultdict(int)
+    bookings = db.execute(
+        update(Booking).where(Booking.user_id == user_id, Booking.deleted_at.is_(None))
+        .values(deleted_at=now, user_id=None).returning(Booking.event_id, Booking.seats)
+        .execution_options(synchronize_session=False)
+    )
+    for event_id, seats in bookings:
+        released[event_id] += seats
+    db.execute(update(Booking).where(Booking.user_id == user_id).values(user_id=None)
+               .execution_options(synchronize_session=False))
+    holds = db.execute(
+        delete(SeatHold).where(SeatHold.user_id == user_id).returning(SeatHold.event_id, SeatHold.seats, SeatHold.status)
+        .execution_options(synchronize_session=False)
+    )
+    for event_id, seats, status in holds:
+        released[event_id] += seats if status == HELD else 0
+    release_seats_many(db, {event_id: seats for event_id, seats in released.items() if seats})
+    return released
+
+def reassign_target(db: Session, user_id: int, reassign_to: int = None):
+    query = select(User.id).where(User.id != user_id)
+    if reassign_to is None:
+        query = query.where(User.role == "admin").order_by(User.id).limit(1)
+    else:
+        query = query.where(User.id == reassign_to)
+    return db.execute(query).scalar()
+
+def user_event_ids(db: Session, user_id: int, owned_events: str = "reassign") -> set:
+    touched = set(db.scalars(union(
+        select(Booking.event_id).where(Booking.user_id == user_id, Booking.deleted_at.is_(None)),
+        select(SeatHold.event_id).where(SeatHold.user_id == user_id),
+    )))
+    if owned_events == "cascade":
+        touched.update(db.scalars(select(Event.id).where(Event.owner_id == user_id, Event.deleted_at.is_(None))))
+    return touched
+
+def delete_user(db: Session, user_id: int, owned_events: str = "reassign", reassign_to: int = None,
+                locked_event_ids: set = None):
     db_user = get_user(db, user_id)
-    if db_user:
-        db.delete(db_user)
+    if not db_user:
+        return None, None
+    owned = select(Event.id).where(Event.owner_id == user_id, Event.deleted_at.is_(None))
+    has_events = db.execute(owned.limit(1)).first() is not None
+    target = None
+    if has_events and owned_events == "reassign":
+        target = reassign_target(db, user_id, reassign_to)
+        if target is None:
+            db.rollback()
+            return None, "no_owner"
+    db.expunge(db_user)
+    touched = user_event_ids(db, user_id, owned_events)
+    now = datetime.utcnow()
+    with events_lock(touched if locked_event_ids is None else locked_event_ids):
+        if target is not None:
+            db.execute(update(Event).where(Event.owner_id == user_id, Event.deleted_at.is_(None))
+                       .values(owner_id=target).execution_options(synchronize_session=False))
+        elif has_events:
+            tombstone_events(db, owned.scalar_subquery(), now)
+        db.execute(update(Event).where(Event.owner_id == user_id).values(owner_id=None)
+                   .execution_options(synchronize_session=False))
+        released = release_user_seats(db, user_id, now)
+        promoted = drain_waitlists(db, list(released))
+        db.execute(update(Review).where(Review.user_id == user_id).values(user_id=None)
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
         db.commit()
-    return db_user
+    schedule_holds(promoted)
+    user_cache.invalidate(user_id)
+    if touched or has_events:
+        response_cache.invalidate("events")
+        seat_hub.publish(*touched)
+    return db_user, None
 
 def create_category(db: Session, cat: CategoryCreate):
     db_cat = Category(**cat.dict())
     db.add(db_cat)
+    bump_version(db)
     db.commit()
+    category_registry.invalidate()
+    response_cache.invalidate("categories")
     db.refresh(db_cat)
     return db_cat
 
 def get_categories(db: Session):
-    return db.query(Category).all()
+    return category_registry.all(db)
 
 def get_category_by_name(db: Session, name: str):
-    return db.query(Category).filter(Category.name == name).first()
+    return category_registry.find(db, name)
+
+def resolve_category_ids(db: Session, names: List[str]) -> List[int]:
+    return category_registry.ids(db, names)
 
 def get_category(db: Session, category_id: int):
-    return db.query(Category).filter(Category.id == category_id).first()
+    return category_registry.get(db, category_id)
 
 def delete_category(db: Session, category_id: int):
-    db_category = get_category(db, category_id)
+    db_category = db.get(Category, category_id)
     if not db_category:
-        return None
+        return None, None
+    if db.execute(select(Event.id).where(Event.category_id == category_id, Event.deleted_at.is_(None))
+                  .limit(1)).first() is not None:
+        return None, "in_use"
+    archive_events(db, select(Event.id).where(Event.category_id == category_id).scalar_subquery(), datetime.utcnow())
     db.delete(db_category)
+    bump_version(db)
     db.commit()
-    return db_category
+    category_registry.invalidate()
+    response_cache.invalidate("categories")
+    return db_category, None
 
 def create_event(db: Session, event: EventCreate, owner_id: int):
-    from crud import get_category_by_name
     cat = get_category_by_name(db, event.category_name)
     if not cat:
         return None
@@ -81,61 +196,209 @@ def create_event(db: Session, event: EventCreate, owner_id: int):
     db_event = Event(**data, owner_id=owner_id)
     db.add(db_event)
     db.commit()
+    response_cache.invalidate("events")
     db.refresh(db_event)
     return db_event
 
 def get_event(db: Session, event_id: int):
-    return db.query(Event).filter(Event.id == event_id).first()
+    return db.query(Event).filter(Event.id == event_id, Event.deleted_at.is_(None)).first()
+
+def get_events(db: Session, skip: int = 0, limit: int = 100, after: tuple = None):
+    query = db.query(Event).filter(Event.deleted_at.is_(None)).order_by(Event.date, Event.id)
+    if after is not None:
+        query = query.filter(tuple_(Event.date, Event.id) > tuple_(*after))
+    return query.offset(skip).limit(limit).all()
+
+EVENT_ROW_COLUMNS = (
+    Event.id, Event.title, Event.date, Event.seats, Event.category_id, Event.owner_id,
+    func.coalesce(EventRating.review_count, 0).label("review_count"),
+    case((EventRating.review_count > 0, EventRating.rating_sum / EventRating.review_count)).label("average_rating"),
+)
 
-def get_events(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Event).offset(skip).limit(limit).all()
+def get_event_rows(db: Session, skip: int = 0, limit: int = 100, after: tuple = None):
+    query = (
+        select(*EVENT_ROW_COLUMNS)
+        .outerjoin(EventRating, EventRating.event_id == Event.id)
+        .where(Event.deleted_at.is_(None))
+        .order_by(Event.date, Event.id)
+    )
+    if after is not None:
+        query = query.where(tuple_(Event.date, Event.id) > tuple_(*after))
+    return db.execute(query.offset(skip).limit(limit)).all()
+
+EVENT_SORTS = {"date": Event.date, "seats": Event.seats}
+
+def get_available_event_rows(db: Session, category_ids: List[int] = None, date_from: datetime = None,
+                             date_to: datetime = None, min_seats: int = 1, sort: str = "date", limit: int = 100,
+                             after: tuple = None):
+    descending = sort.startswith("-")
+    key = EVENT_SORTS[sort.lstrip("-")]
+    query = (
+        select(*EVENT_ROW_COLUMNS)
+        .outerjoin(EventRating, EventRating.event_id == Event.id)
+        .where(Event.seats >= min_seats, Event.deleted_at.is_(None))
+    )
+    if category_ids is not None:
+        query = query.where(Event.category_id.in_(category_ids))
+    if date_from is not None:
+        query = query.where(Event.date >= date_from)
+    if date_to is not None:
+        query = query.where(Event.date <= date_to)
+    if after is not None:
+        position = tuple_(key, Event.id)
+        query = query.where(position < tuple_(*after) if descending else position > tuple_(*after))
+    order = (key.desc(), Event.id.desc()) if descending else (key, Event.id)
+    return db.execute(query.order_by(*order).limit(limit)).all()
+
+EVENT_FIELDS = ("title", "date", "seats", "category_id")
+EVENT_UPDATE_FIELDS = EVENT_FIELDS + ("category_name",)
 
 def update_event(db: Session, event_id: int, data: dict):
     db_event = get_event(db, event_id)
     if not db_event:
         return None
     if 'category_name' in data:
-        from crud import get_category_by_name
         cat = get_category_by_name(db, data['category_name'])
         if not cat:
             return None
         data['category_id'] = cat.id
         data.pop('category_name')
     for k, v in data.items():
-        if hasattr(db_event, k):
+        if k in EVENT_FIELDS:
             setattr(db_event, k, v)
-    db.commit()
+    promoted = []
+    if 'seats' in data:
+        with event_lock(event_id):
+            db.flush()
+            promoted = drain_waitlist(db, event_id)
+            db.commit()
+    else:
+        db.commit()
+    schedule_holds(promoted)
+    response_cache.invalidate("events")
+    if 'seats' in data:
+        seat_hub.publish(event_id)
     db.refresh(db_event)
     return db_event
 
+def get_event_stats(db: Session, event_id: int):
+    event = get_event(db, event_id)
+    if not event:
+        return None
+    rating = event.rating
+    return {
+        "event_id": event.id,
+        "review_count": event.review_count,
+        "average_rating": event.average_rating,
+        "min_rating": rating.rating_min if rating else None,
+        "max_rating": rating.rating_max if rating else None,
+        "histogram": rating.histogram if rating else {star: 0 for star in STARS},
+    }
+
 def delete_event(db: Session, event_id: int):
     db_event = get_event(db, event_id)
-    if db_event:
-        db.delete(db_event)
+    if not db_event:
+        return None
+    db.expunge(db_event)
+    with event_lock(event_id):
+        tombstone_events(db, [event_id], datetime.utcnow())
         db.commit()
+    response_cache.invalidate("events")
+    seat_hub.publish(event_id)
     return db_event
 
 def create_booking(db: Session, booking: BookingCreate, user_id: int):
-    from datetime import datetime
-    event = get_event(db, booking.event_id)
-    if not event:
-        return None
-    if event.date <= datetime.utcnow():
-        return None
-    if event.seats < booking.seats:
-        return None
-    db_booking = Booking(**booking.dict(), user_id=user_id)
-    event.seats -= booking.seats
-    db.add(db_booking)
-    db.commit()
+    db.connection()
+    with event_lock(booking.event_id):
+        if not reserve_seats(db, booking.event_id, booking.seats, queue_empty()):
+            db.rollback()
+            return None
+        db_booking = Booking(**booking.dict(), user_id=user_id)
+        db.add(db_booking)
+        db.commit()
+    response_cache.invalidate("events")
+    seat_hub.publish(booking.event_id)
     db.refresh(db_booking)
     return db_booking
 
+BOOKING_FAILURES = {
+    "not_found": "Событие не найдено",
+    "started": "Нельзя забронировать событие, которое уже началось",
+    "no_seats": "Недостаточно свободных мест",
+    "conflict": "Невозможно создать бронирование",
+    "waitlisted": "Места раздаются через лист ожидания, используйте POST /holds",
+    "over_capacity": "Запрошено больше мест, чем вмещает событие",
+    "waitlist_full": "Слишком много заявок в листах ожидания",
+}
+
+def booking_failure(event, seats: int):
+    if event is None:
+        return "not_found"
+    if event.date <= datetime.utcnow():
+        return "started"
+    if event.seats < seats:
+        return "no_seats"
+    return None
+
+def create_bookings(db: Session, items: List[BookingCreate], user_id: int):
+    seats_by_event = defaultdict(int)
+    for item in items:
+        seats_by_event[item.event_id] += item.seats
+    db.connection()
+    with events_lock(seats_by_event):
+        events = {
+            row.id: row for row in
+            db.query(Event.id, Event.date, Event.seats)
+            .filter(Event.id.in_(seats_by_event), Event.deleted_at.is_(None))
+            .order_by(Event.id)
+        }
+        for event_id in sorted(seats_by_event):
+            failure = booking_failure(events.get(event_id), seats_by_event[event_id])
+            if failure:
+                db.rollback()
+                return None, (event_id, failure)
+        for event_id in sorted(waitlisted_events(db, seats_by_event)):
+            db.rollback()
+            return None, (event_id, "waitlisted")
+        if not reserve_seats_many(db, seats_by_event):
+            db.rollback()
+            return None, (None, "conflict")
+        bookings = [Booking(event_id=item.event_id, seats=item.seats, user_id=user_id) for item in items]
+        db.add_all(bookings)
+        db.flush()
+        ids = [booking.id for booking in bookings]
+        db.commit()
+    response_cache.invalidate("events")
+    seat_hub.publish(*seats_by_event)
+    by_id = {booking.id: booking for booking in db.query(Booking).filter(Booking.id.in_(ids))}
+    return [by_id[booking_id] for booking_id in ids], None
+
 def get_booking(db: Session, booking_id: int):
-    return db.query(Booking).filter(Booking.id == booking_id).first()
+    return db.query(Booking).filter(Booking.id == booking_id, Booking.deleted_at.is_(None)).first()
+
+def get_user_bookings(db: Session, user_id: int, limit: int = None, after_id: int = None):
+    query = db.query(Booking).filter(Booking.user_id == user_id, Booking.deleted_at.is_(None)).order_by(Booking.id)
+    if after_id is not None:
+        query = query.filter(Booking.id > after_id)
+    return query.limit(limit).all()
 
-def get_user_bookings(db: Session, user_id: int):
-    return db.query(Booking).filter(Booking.user_id == user_id).all()
+def get_user_booking_rows(db: Session, user_id: int, limit: int = None, after_id: int = None):
+    query = select(Booking.id, Booking.seats, Booking.user_id, Booking.event_id).where(
+        Booking.user_id == user_id, Booking.deleted_at.is_(None))
+    if after_id is not None:
+        query = query.where(Booking.id > after_id)
+    return db.execute(query.order_by(Booking.id).limit(limit)).all()
+
+def get_user_booking_history(db: Session, user_id: int, limit: int = None, after_id: int = None):
+    parts = []
+    for model in (Booking, ArchivedBooking):
+        part = select(model.id, model.seats, model.user_id, model.event_id, model.deleted_at).where(
+            model.user_id == user_id)
+        if after_id is not None:
+            part = part.where(model.id > after_id)
+        parts.append(part)
+    history = union_all(*parts).subquery()
+    return db.execute(select(history).order_by(history.c.id).limit(limit)).all()
 
 def update_booking(db: Session, booking_id: int, data: dict, user_id: int, allow_admin: bool = False):
     db_booking = get_booking(db, booking_id)
@@ -143,41 +406,60 @@ def update_booking(db: Session, booking_id: int, data: dict, user_id: int, allow
         return None
     if not allow_admin and db_booking.user_id != user_id:
         return None
-    event = get_event(db, db_booking.event_id)
     if 'seats' in data:
         new_seats = data['seats']
-        if new_seats > db_booking.seats:
-            if event.seats < (new_seats - db_booking.seats):
+        delta = new_seats - db_booking.seats
+        db.connection()
+        with event_lock(db_booking.event_id):
+            if delta > 0 and not reserve_seats(db, db_booking.event_id, delta, queue_empty()):
+                db.rollback()
                 return None
-            event.seats -= (new_seats - db_booking.seats)
-        elif new_seats < db_booking.seats:
-            event.seats += (db_booking.seats - new_seats)
-        db_booking.seats = new_seats
-    db.commit()
+            promoted = []
+            if delta < 0:
+                release_seats(db, db_booking.event_id, -delta)
+                promoted = drain_waitlist(db, db_booking.event_id)
+            db_booking.seats = new_seats
+            db.commit()
+        schedule_holds(promoted)
+        response_cache.invalidate("events")
+        seat_hub.publish(db_booking.event_id)
+    else:
+        db.commit()
     db.refresh(db_booking)
     return db_booking
 
 def cancel_booking(db: Session, booking_id: int, user_id: int, allow_admin: bool = False):
-    query = db.query(Booking).filter(Booking.id == booking_id)
+    query = db.query(Booking).filter(Booking.id == booking_id, Booking.deleted_at.is_(None))
     if not allow_admin:
         query = query.filter(Booking.user_id == user_id)
     booking = query.first()
     if not booking:
         return None
-    event = get_event(db, booking.event_id)
-    if event:
-        event.seats += booking.seats
-    db.delete(booking)
-    db.commit()
+    db.expunge(booking)
+    promoted = []
+    db.connection()
+    with event_lock(booking.event_id or 0):
+        cancelled = db.execute(
+            update(Booking).where(Booking.id == booking.id, Booking.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        ).rowcount
+        if not cancelled:
+            db.rollback()
+            return None
+        if booking.event_id is not None:
+            release_seats(db, booking.event_id, booking.seats)
+            promoted = drain_waitlist(db, booking.event_id)
+        db.commit()
+    schedule_holds(promoted)
+    response_cache.invalidate("events")
+    seat_hub.publish(booking.event_id)
     return booking
 
 def create_review(db: Session, review: ReviewCreate, user_id: int):
-    from datetime import datetime
-    from models import Booking
-    
     booking = db.query(Booking).filter(
         Booking.user_id == user_id,
-        Booking.event_id == review.event_id
+        Booking.event_id == review.event_id,
+        Booking.deleted_at.is_(None)
     ).first()
     if not booking:
         return None
@@ -190,22 +472,56 @@ def create_review(db: Session, review: ReviewCreate, user_id: int):
     
     existing_review = db.query(Review).filter(
         Review.user_id == user_id,
-        Review.event_id == review.event_id
+        Review.event_id == review.event_id,
+        Review.deleted_at.is_(None)
     ).first()
     if existing_review:
         return None
     
     db_review = Review(**review.dict(), user_id=user_id, is_edited=0)
     db.add(db_review)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return None
+    add_rating(db, review.event_id, review.rating)
     db.commit()
+    response_cache.invalidate("events")
     db.refresh(db_review)
     return db_review
 
 def get_review(db: Session, review_id: int):
-    return db.query(Review).filter(Review.id == review_id).first()
+    return db.query(Review).filter(Review.id == review_id, Review.deleted_at.is_(None)).first()
 
 def get_reviews_by_event(db: Session, event_id: int):
-    return db.query(Review).filter(Review.event_id == event_id).all()
+    return (
+        db.query(Review)
+        .options(joinedload(Review.user), joinedload(Review.event))
+        .filter(Review.event_id == event_id, Review.deleted_at.is_(None))
+        .all()
+    )
+
+def review_rows(db: Session):
+    return (
+        db.query(Review.id, Review.text, Review.rating, Review.user_id, Review.event_id, Review.is_edited,
+                 User.username, Event.title.label("event_title"))
+        .outerjoin(User, User.id == Review.user_id)
+        .outerjoin(Event, Event.id == Review.event_id)
+        .filter(Review.deleted_at.is_(None))
+    )
+
+def get_review_response(db: Session, review_id: int):
+    row = review_rows(db).filter(Review.id == review_id).first()
+    return row._asdict() if row else None
+
+def get_event_review_responses(db: Session, event_id: int, limit: int = None, after_id: int = None):
+    query = review_rows(db).filter(Review.event_id == event_id).order_by(Review.id)
+    if after_id is not None:
+        query = query.filter(Review.id > after_id)
+    return [row._asdict() for row in query.limit(limit)]
+
+REVIEW_FIELDS = ("text", "rating")
 
 def update_review(db: Session, review_id: int, data: dict, user_id: int, allow_admin: bool = False):
     db_review = get_review(db, review_id)
@@ -213,11 +529,16 @@ def update_review(db: Session, review_id: int, data: dict, user_id: int, allow_a
         return None
     if db_review.user_id != user_id:
         return None
+    old_rating = db_review.rating
     for k, v in data.items():
-        if hasattr(db_review, k):
+        if k in REVIEW_FIELDS:
             setattr(db_review, k, v)
     db_review.is_edited = 1
+    if old_rating != db_review.rating:
+        remove_rating(db, db_review.event_id, old_rating)
+        add_rating(db, db_review.event_id, db_review.rating)
     db.commit()
+    response_cache.invalidate("events")
     db.refresh(db_review)
     return db_review
 
@@ -227,6 +548,15 @@ def delete_review(db: Session, review_id: int, user_id: int, allow_admin: bool =
         return None
     if not allow_admin and db_review.user_id != user_id:
         return None
-    db.delete(db_review)
+    db.expunge(db_review)
+    deleted = db.execute(
+        update(Review).where(Review.id == review_id, Review.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    ).rowcount
+    if not deleted:
+        db.rollback()
+        return None
+    remove_rating(db, db_review.event_id, db_review.rating)
     db.commit()
+    response_cache.invalidate("events")
     return db_review
@@ -0,0 +1,163 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import *
+from reservations import async_event_lock, async_events_lock
+import bulk
+import crud
+import holds
+import search
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user, user_id)
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.run_sync(crud.get_user_by_username, username)
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int = None):
+    return await db.run_sync(crud.get_users, skip, limit, after_id)
+
+async def get_user_rows(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int = None):
+    return await db.run_sync(crud.get_user_rows, skip, limit, after_id)
+
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: str = None):
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+async def update_user(db: AsyncSession, user_id: int, data: UserUpdate, hashed_password: str = None):
+    return await db.run_sync(crud.update_user, user_id, data, hashed_password)
+
+async def delete_user(db: AsyncSession, user_id: int, owned_events: str = "reassign", reassign_to: int = None):
+    event_ids = await db.run_sync(crud.user_event_ids, user_id, owned_events)
+    async with async_events_lock(event_ids):
+        return await db.run_sync(crud.delete_user, user_id, owned_events, reassign_to, event_ids)
+
+async def create_category(db: AsyncSession, cat: CategoryCreate):
+    return await db.run_sync(crud.create_category, cat)
+
+async def get_categories(db: AsyncSession):
+    return await db.run_sync(crud.get_categories)
+
+async def get_category_by_name(db: AsyncSession, name: str):
+    return await db.run_sync(crud.get_category_by_name, name)
+
+async def get_category(db: AsyncSession, category_id: int):
+    return await db.run_sync(crud.get_category, category_id)
+
+async def delete_category(db: AsyncSession, category_id: int):
+    return await db.run_sync(crud.delete_category, category_id)
+
+async def create_event(db: AsyncSession, event: EventCreate, owner_id: int):
+    return await db.run_sync(crud.create_event, event, owner_id)
+
+async def get_event(db: AsyncSession, event_id: int):
+    return await db.run_sync(crud.get_event, event_id)
+
+async def get_events(db: AsyncSession, skip: int = 0, limit: int = 100, after: tuple = None):
+    return await db.run_sync(crud.get_events, skip, limit, after)
+
+async def get_event_rows(db: AsyncSession, skip: int = 0, limit: int = 100, after: tuple = None):
+    return await db.run_sync(crud.get_event_rows, skip, limit, after)
+
+async def resolve_category_ids(db: AsyncSession, names: List[str]):
+    return await db.run_sync(crud.resolve_category_ids, names)
+
+async def get_available_event_rows(db: AsyncSession, category_ids: List[int] = None, date_from: datetime = None,
+                                   date_to: datetime = None, min_seats: int = 1, sort: str = "date",
+                                   limit: int = 100, after: tuple = None):
+    return await db.run_sync(crud.get_available_event_rows, category_ids, date_from, date_to, min_seats, sort, limit,
+                             after)
+
+async def search_events(db: AsyncSession, q: str, limit: int = 20, after: tuple = None, category_id: int = None,
+                        date_from: datetime = None, date_to: datetime = None):
+    return await db.run_sync(search.search_events, q, limit, after, category_id, date_from, date_to)
+
+async def get_event_stats(db: AsyncSession, event_id: int):
+    return await db.run_sync(crud.get_event_stats, event_id)
+
+async def update_event(db: AsyncSession, event_id: int, data: dict):
+    async with async_event_lock(event_id):
+        return await db.run_sync(crud.update_event, event_id, data)
+
+async def delete_event(db: AsyncSession, event_id: int):
+    async with async_event_lock(event_id):
+        return await db.run_sync(crud.delete_event, event_id)
+
+async def create_booking(db: AsyncSession, booking: BookingCreate, user_id: int):
+    async with async_event_lock(booking.event_id):
+        return await db.run_sync(crud.create_booking, booking, user_id)
+
+async def create_bookings(db: AsyncSession, items: List[BookingCreate], user_id: int):
+    async with async_events_lock({item.event_id for item in items}):
+        return await db.run_sync(crud.create_bookings, items, user_id)
+
+async def get_booking(db: AsyncSession, booking_id: int):
+    return await db.run_sync(crud.get_booking, booking_id)
+
+async def get_user_bookings(db: AsyncSession, user_id: int, limit: int = None, after_id: int = None):
+    return await db.run_sync(crud.get_user_bookings, user_id, limit, after_id)
+
+async def get_user_booking_rows(db: AsyncSession, user_id: int, limit: int = None, after_id: int = None):
+    return await db.run_sync(crud.get_user_booking_rows, user_id, limit, after_id)
+
+async def get_user_booking_history(db: AsyncSession, user_id: int, limit: int = None, after_id: int = None):
+    return await db.run_sync(crud.get_user_booking_history, user_id, limit, after_id)
+
+async def update_booking(db: AsyncSession, booking_id: int, data: dict, user_id: int, allow_admin: bool = False):
+    db_booking = await get_booking(db, booking_id)
+    if not db_booking:
+        return None
+    async with async_event_lock(db_booking.event_id or 0):
+        return await db.run_sync(crud.update_booking, booking_id, data, user_id, allow_admin)
+
+async def cancel_booking(db: AsyncSession, booking_id: int, user_id: int, allow_admin: bool = False):
+    db_booking = await get_booking(db, booking_id)
+    if not db_booking:
+        return None
+    async with async_event_lock(db_booking.event_id or 0):
+        return await db.run_sync(crud.cancel_booking, booking_id, user_id, allow_admin)
+
+async def create_hold(db: AsyncSession, event_id: int, seats: int, user_id: int):
+    async with async_event_lock(event_id):
+        return await db.run_sync(holds.create_hold_response, event_id, seats, user_id)
+
+async def get_hold(db: AsyncSession, hold_id: int):
+    return await db.run_sync(holds.get_hold, hold_id)
+
+async def waitlisted_events(db: AsyncSession, event_ids) -> set:
+    return await db.run_sync(holds.waitlisted_events, event_ids)
+
+async def hold_response(db: AsyncSession, hold):
+    return await db.run_sync(holds.hold_response, hold)
+
+async def confirm_hold(db: AsyncSession, hold_id: int):
+    return await db.run_sync(holds.confirm_hold, hold_id)
+
+async def cancel_hold(db: AsyncSession, hold):
+    async with async_event_lock(hold.event_id):
+        return await db.run_sync(holds.cancel_hold, hold.id)
+
+async def create_review(db: AsyncSession, review: ReviewCreate, user_id: int):
+    return await db.run_sync(crud.create_review, review, user_id)
+
+async def get_review(db: AsyncSession, review_id: int):
+    return await db.run_sync(crud.get_review, review_id)
+
+async def get_reviews_by_event(db: AsyncSession, event_id: int):
+    return await db.run_sync(crud.get_reviews_by_event, event_id)
+
+async def get_review_response(db: AsyncSession, review_id: int):
+    return await db.run_sync(crud.get_review_response, review_id)
+
+async def get_event_review_responses(db: AsyncSession, event_id: int, limit: int = None, after_id: int = None):
+    return await db.run_sync(crud.get_event_review_responses, event_id, limit, after_id)
+
+async def update_review(db: AsyncSession, review_id: int, data: dict, user_id: int, allow_admin: bool = False):
+    return await db.run_sync(crud.update_review, review_id, data, user_id, allow_admin)
+
+async def delete_review(db: AsyncSession, review_id: int, user_id: int, allow_admin: bool = False):
+    return await db.run_sync(crud.delete_review, review_id, user_id, allow_admin)
+
+async def import_events(db: AsyncSession, batch: list, owner_id: int, report: bulk.ImportReport):
+    return await db.run_sync(bulk.import_events, batch, owner_id, report)
+
+async def import_bookings(db: AsyncSession, batch: list, user_id: int, is_admin: bool, report: bulk.ImportReport):
+    return await db.run_sync(bulk.import_bookings, batch, user_id, is_admin, report)
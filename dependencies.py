@@ -1,5 +1,6 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import ASYNC_DATABASE, SessionLocal, AsyncSessionLocal, ThreadedSessionLocal
 
 def get_db():
     db = SessionLocal()
@@ -7,3 +8,26 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class ThreadedSession:
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.session.close)
+
+async def get_threaded_db():
+    db = ThreadedSession(ThreadedSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+get_session = get_async_db if ASYNC_DATABASE else get_threaded_db
@@ -0,0 +1,110 @@
+import heapq
+import math
+import threading
+import time
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal
+from models import ExpiringKey
+
+class KeyStoreFull(Exception):
+    pass
+
+class MemoryKeyStore:
+    blocking = False
+
+    def __init__(self, max_entries: int = 100000, bucket_seconds: float = 1.0):
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self._expiry = {}
+        self._buckets = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        while self._heap and (self._heap[0] + 1) * self.bucket_seconds <= now:
+            bucket = heapq.heappop(self._heap)
+            for key in self._buckets.pop(bucket, ()):
+                expires_at = self._expiry.get(key)
+                if expires_at is not None and expires_at <= now:
+                    del self._expiry[key]
+
+    def add(self, key: str, expires_at: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            current = self._expiry.get(key)
+            if current is not None and current > now:
+                return False
+            if current is None and len(self._expiry) >= self.max_entries:
+                raise KeyStoreFull(key)
+            self._expiry[key] = expires_at
+            bucket = math.floor(expires_at / self.bucket_seconds)
+            if bucket not in self._buckets:
+                self._buckets[bucket] = []
+                heapq.heappush(self._heap, bucket)
+            self._buckets[bucket].append(key)
+            return True
+
+    def contains(self, key: str) -> bool:
+        expires_at = self._expiry.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._expiry)
+
+class DatabaseKeyStore:
+    blocking = True
+
+    def __init__(self, namespace: str, session_factory=SessionLocal, purge_interval: float = 5.0):
+        self.namespace = namespace
+        self.session_factory = session_factory
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    def _purge(self, db, now: float):
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        db.execute(delete(ExpiringKey).where(ExpiringKey.namespace == self.namespace, ExpiringKey.expires_at <= now))
+
+    def add(self, key: str, expires_at: float) -> bool:
+        now = time.time()
+        db = self.session_factory()
+        try:
+            self._purge(db, now)
+            db.add(ExpiringKey(namespace=self.namespace, key=key, expires_at=expires_at))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+            revived = db.execute(
+                update(ExpiringKey)
+                .where(ExpiringKey.namespace == self.namespace, ExpiringKey.key == key,
+                       ExpiringKey.expires_at <= now)
+                .values(expires_at=expires_at)
+            ).rowcount
+            db.commit()
+            return revived == 1
+        finally:
+            db.close()
+
+    def contains(self, key: str) -> bool:
+        db = self.session_factory()
+        try:
+            found = db.execute(
+                select(ExpiringKey.key)
+                .where(ExpiringKey.namespace == self.namespace, ExpiringKey.key == key,
+                       ExpiringKey.expires_at > time.time())
+            ).first()
+            return found is not None
+        finally:
+            db.close()
+
+def create_key_store(backend: str, namespace: str, max_entries: int = 100000):
+    if backend == "memory":
+        return MemoryKeyStore(max_entries)
+    if backend == "db":
+        return DatabaseKeyStore(namespace)
+    raise ValueError(f"Unknown key store backend: {backend}")
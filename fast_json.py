@@ -0,0 +1,24 @@
+import json
+from datetime import datetime
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def dump_rows(rows) -> bytes:
+    return dumps([row._asdict() for row in rows])
+
+def rows_response(rows, headers: dict = None) -> Response:
+    return Response(content=dump_rows(rows), media_type="application/json", headers=headers)
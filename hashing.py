@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+from metrics import observe_bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(max(HASH_WORKERS, 1) * 8)))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+class HashPoolSaturated(Exception):
+    pass
+
+_executor = None
+_counters = {"pending": 0, "completed": 0, "rejected": 0}
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password_sync(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+async def _submit(fn, *args):
+    if _counters["pending"] >= HASH_MAX_PENDING:
+        _counters["rejected"] += 1
+        raise HashPoolSaturated()
+    _counters["pending"] += 1
+    started = time.perf_counter()
+    try:
+        if HASH_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _counters["pending"] -= 1
+        _counters["completed"] += 1
+        observe_bcrypt(fn.__name__.split("_")[0], time.perf_counter() - started)
+
+async def hash_password(password: str) -> str:
+    return await _submit(hash_password_sync, password)
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _submit(verify_password_sync, plain, hashed)
+
+def stats() -> dict:
+    return dict(_counters, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
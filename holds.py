@@ -0,0 +1,295 @@
+import asyncio
+import heapq
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Booking, Event, SeatHold
+from reservations import event_lock, events_lock, reserve_seats, release_seats, release_seats_many
+from response_cache import response_cache
+from live import seat_hub
+
+HOLD_TTL = float(os.getenv("HOLD_TTL", "300"))
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "5"))
+HOLD_DRAIN_BATCH = 100
+HOLD_MAX_WAITING = int(os.getenv("HOLD_MAX_WAITING", "5"))
+
+HELD = "held"
+WAITING = "waiting"
+CONFIRMED = "confirmed"
+EXPIRED = "expired"
+CANCELLED = "cancelled"
+
+logger = logging.getLogger(__name__)
+
+class HoldTimer:
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def schedule(self, hold_id: int, expires_at: datetime):
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, hold_id))
+
+    def pop_due(self, now: datetime) -> list:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def next_deadline(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._heap)
+
+hold_timer = HoldTimer()
+
+def hold_failure(event):
+    if event is None:
+        return "not_found"
+    if event.date <= datetime.utcnow():
+        return "started"
+    return None
+
+def _hold(db: Session, hold: SeatHold, now: datetime) -> SeatHold:
+    hold.status = HELD
+    hold.expires_at = now + timedelta(seconds=HOLD_TTL)
+    return hold
+
+def event_capacity(db: Session, event_id: int) -> int:
+    booked = select(func.coalesce(func.sum(Booking.seats), 0)).where(
+        Booking.event_id == event_id, Booking.deleted_at.is_(None)).scalar_subquery()
+    held = select(func.coalesce(func.sum(SeatHold.seats), 0)).where(
+        SeatHold.event_id == event_id, SeatHold.status == HELD).scalar_subquery()
+    return db.scalar(select(Event.seats + booked + held).where(Event.id == event_id)) or 0
+
+def queue_empty():
+    return ~exists().where(SeatHold.event_id == Event.id, SeatHold.status == WAITING)
+
+def waitlisted_events(db: Session, event_ids) -> set:
+    return set(db.scalars(
+        select(SeatHold.event_id).where(SeatHold.event_id.in_(event_ids), SeatHold.status == WAITING).distinct()
+    ))
+
+def drain_waitlist(db: Session, event_id: int) -> list:
+    now = datetime.utcnow()
+    promoted = []
+    capacity = None
+    last_id = 0
+    while True:
+        waiting = (
+            db.query(SeatHold)
+            .filter(SeatHold.event_id == event_id, SeatHold.status == WAITING, SeatHold.id > last_id)
+            .order_by(SeatHold.id)
+            .limit(HOLD_DRAIN_BATCH)
+            .all()
+        )
+        for hold in waiting:
+            if reserve_seats(db, event_id, hold.seats):
+                promoted.append(_hold(db, hold, now))
+                continue
+            if capacity is None:
+                capacity = event_capacity(db, event_id)
+            if hold.seats <= capacity:
+                return promoted
+            hold.status = EXPIRED
+        if len(waiting) < HOLD_DRAIN_BATCH:
+            return promoted
+        last_id = waiting[-1].id
+
+def drain_waitlists(db: Session, event_ids) -> list:
+    queued = db.query(SeatHold.event_id).filter(SeatHold.event_id.in_(event_ids), SeatHold.status == WAITING).distinct()
+    promoted = []
+    for event_id, in queued.all():
+        promoted.extend(drain_waitlist(db, event_id))
+    return promoted
+
+def schedule(holds: list):
+    for hold in holds:
+        hold_timer.schedule(hold.id, hold.expires_at)
+
+def create_hold(db: Session, event_id: int, seats: int, user_id: int):
+    db.connection()
+    with event_lock(event_id):
+        event = db.query(Event.id, Event.date).filter(Event.id == event_id, Event.deleted_at.is_(None)).first()
+        failure = hold_failure(event)
+        if failure:
+            db.rollback()
+            return None, failure
+        if seats > event_capacity(db, event_id):
+            db.rollback()
+            return None, "over_capacity"
+        now = datetime.utcnow()
+        hold = SeatHold(event_id=event_id, user_id=user_id, seats=seats, status=WAITING, created_at=now)
+        queued = db.query(SeatHold.id).filter(SeatHold.event_id == event_id, SeatHold.status == WAITING).first()
+        if queued is None and reserve_seats(db, event_id, seats):
+            _hold(db, hold, now)
+        elif db.query(func.count(SeatHold.id)).filter(SeatHold.user_id == user_id,
+                                                      SeatHold.status == WAITING).scalar() >= HOLD_MAX_WAITING:
+            db.rollback()
+            return None, "waitlist_full"
+        db.add(hold)
+        db.commit()
+    if hold.status == HELD:
+        hold_timer.schedule(hold.id, hold.expires_at)
+        response_cache.invalidate("events")
+        seat_hub.publish(event_id)
+    return hold, None
+
+def get_hold(db: Session, hold_id: int):
+    return db.query(SeatHold).filter(SeatHold.id == hold_id).first()
+
+def hold_position(db: Session, hold: SeatHold):
+    if hold.status != WAITING:
+        return None
+    return db.query(func.count(SeatHold.id)).filter(
+        SeatHold.event_id == hold.event_id, SeatHold.status == WAITING, SeatHold.id <= hold.id
+    ).scalar()
+
+def hold_response(db: Session, hold: SeatHold) -> dict:
+    status = hold.status
+    if status == HELD and hold.expires_at <= datetime.utcnow():
+        status = EXPIRED
+    return {
+        "id": hold.id,
+        "event_id": hold.event_id,
+        "seats": hold.seats,
+        "status": status,
+        "position": hold_position(db, hold),
+        "expires_at": hold.expires_at if status == HELD else None,
+    }
+
+def get_hold_response(db: Session, hold_id: int):
+    hold = get_hold(db, hold_id)
+    return hold_response(db, hold) if hold else None
+
+def create_hold_response(db: Session, event_id: int, seats: int, user_id: int):
+    hold, failure = create_hold(db, event_id, seats, user_id)
+    return (hold_response(db, hold) if hold else None), failure
+
+def confirm_hold(db: Session, hold_id: int):
+    confirmed = db.execute(
+        update(SeatHold)
+        .where(SeatHold.id == hold_id, SeatHold.status == HELD, SeatHold.expires_at > datetime.utcnow())
+        .values(status=CONFIRMED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not confirmed:
+        db.rollback()
+        return None
+    hold = get_hold(db, hold_id)
+    booking = Booking(event_id=hold.event_id, user_id=hold.user_id, seats=hold.seats)
+    db.add(booking)
+    db.commit()
+    db.refresh(booking)
+    return booking
+
+def _release_hold(db: Session, hold_id: int, from_status: str, to_status: str) -> bool:
+    return db.execute(
+        update(SeatHold)
+        .where(SeatHold.id == hold_id, SeatHold.status == from_status)
+        .values(status=to_status, expires_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+def cancel_hold(db: Session, hold_id: int):
+    hold = get_hold(db, hold_id)
+    if not hold or hold.status not in (HELD, WAITING):
+        return None
+    db.connection()
+    promoted = []
+    with event_lock(hold.event_id):
+        if not _release_hold(db, hold.id, hold.status, CANCELLED):
+            db.rollback()
+            return None
+        if hold.status == HELD:
+            release_seats(db, hold.event_id, hold.seats)
+            promoted = drain_waitlist(db, hold.event_id)
+        db.commit()
+    schedule(promoted)
+    response_cache.invalidate("events")
+    seat_hub.publish(hold.event_id)
+    db.refresh(hold)
+    return hold
+
+def expire_holds(db: Session, now: datetime = None) -> int:
+    now = now or datetime.utcnow()
+    due = (SeatHold.status == HELD, SeatHold.expires_at <= now)
+    event_ids = [event_id for event_id, in db.query(SeatHold.event_id).filter(*due).distinct()]
+    if not event_ids:
+        return 0
+    db.connection()
+    with events_lock(event_ids):
+        expired = db.execute(
+            update(SeatHold)
+            .where(*due)
+            .values(status=EXPIRED, expires_at=None)
+            .returning(SeatHold.event_id, SeatHold.seats)
+            .execution_options(synchronize_session=False)
+        ).all()
+        released = defaultdict(int)
+        for event_id, seats in expired:
+            released[event_id] += seats
+        release_seats_many(db, released)
+        promoted = drain_waitlists(db, list(released))
+        db.commit()
+    schedule(promoted)
+    if expired:
+        response_cache.invalidate("events")
+        seat_hub.publish(*released)
+    return len(expired)
+
+def expire_due(session_factory=SessionLocal, force: bool = False) -> int:
+    now = datetime.utcnow()
+    if not hold_timer.pop_due(now) and not force:
+        return 0
+    db = session_factory()
+    try:
+        return expire_holds(db, now)
+    finally:
+        db.close()
+
+def load_active_holds(session_factory=SessionLocal) -> int:
+    db = session_factory()
+    try:
+        rows = db.query(SeatHold.id, SeatHold.expires_at).filter(SeatHold.status == HELD).all()
+    finally:
+        db.close()
+    for hold_id, expires_at in rows:
+        hold_timer.schedule(hold_id, expires_at)
+    return len(rows)
+
+async def run_sweeper():
+    force = True
+    while True:
+        try:
+            await run_in_threadpool(expire_due, SessionLocal, force)
+        except Exception:
+            logger.exception("Seat hold sweep failed")
+        deadline = hold_timer.next_deadline()
+        delay = HOLD_SWEEP_INTERVAL
+        if deadline is not None:
+            delay = min(delay, max((deadline - datetime.utcnow()).total_seconds(), 0.0))
+        force = delay >= HOLD_SWEEP_INTERVAL
+        await asyncio.sleep(delay)
+
+_sweeper = None
+
+async def start_sweeper():
+    global _sweeper
+    await run_in_threadpool(load_active_holds)
+    _sweeper = asyncio.get_running_loop().create_task(run_sweeper())
+
+async def stop_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        _sweeper = None
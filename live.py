@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import List
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database import SessionLocal
+from models import Event
+
+LIVE_MAX_RATE = float(os.getenv("LIVE_MAX_RATE", "2"))
+LIVE_MAX_EVENTS = int(os.getenv("LIVE_MAX_EVENTS", "50"))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+
+logger = logging.getLogger(__name__)
+
+def load_seats(event_ids) -> dict:
+    with SessionLocal() as db:
+        live = select(Event.id, Event.seats).where(Event.id.in_(list(event_ids)), Event.deleted_at.is_(None))
+        return dict(db.execute(live).all())
+
+class Subscription:
+    __slots__ = ("event_ids", "pending", "wake")
+
+    def __init__(self, event_ids: List[int]):
+        self.event_ids = event_ids
+        self.pending = {}
+        self.wake = asyncio.Event()
+
+    def deliver(self, event_id: int, seats):
+        self.pending[event_id] = seats
+        self.wake.set()
+
+    def drain(self) -> dict:
+        pending, self.pending = self.pending, {}
+        self.wake.clear()
+        return pending
+
+class SeatHub:
+    def __init__(self, load=load_seats, max_rate: float = LIVE_MAX_RATE, max_subscribers: int = LIVE_MAX_SUBSCRIBERS):
+        self.load = load
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.max_subscribers = max_subscribers
+        self.subscribers = defaultdict(set)
+        self.count = 0
+        self.dirty = set()
+        self.sent_at = {}
+        self.published = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    def publish(self, *event_ids: int):
+        watched = [event_id for event_id in event_ids if event_id in self.subscribers]
+        if not watched:
+            return
+        with self._lock:
+            self.published += len(watched)
+            idle = not self.dirty
+            self.dirty.update(watched)
+        if idle and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            if self._task is not None and not self._task.done():
+                self._task.cancel()
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self.run())
+
+    def subscribe(self, event_ids: List[int]) -> Subscription:
+        if self.count >= self.max_subscribers:
+            raise HTTPException(status_code=503, detail="Too many live subscribers", headers={"Retry-After": "5"})
+        self._ensure_flusher()
+        subscription = Subscription(event_ids)
+        for event_id in event_ids:
+            self.subscribers[event_id].add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for event_id in subscription.event_ids:
+            watchers = self.subscribers.get(event_id)
+            if watchers is None:
+                continue
+            watchers.discard(subscription)
+            if not watchers:
+                del self.subscribers[event_id]
+                self.sent_at.pop(event_id, None)
+        self.count -= 1
+
+    def _take_due(self, now: float):
+        with self._lock:
+            due = [event_id for event_id in self.dirty if self.sent_at.get(event_id, 0.0) + self.interval <= now]
+            self.dirty.difference_update(due)
+            later = [self.sent_at[event_id] + self.interval for event_id in self.dirty]
+        return due, min(later) if later else None
+
+    async def run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            now = time.monotonic()
+            due, next_at = self._take_due(now)
+            if due:
+                try:
+                    seats = await run_in_threadpool(self.load, due)
+                except Exception:
+                    logger.exception("Seat availability refresh failed")
+                    seats = None
+                if seats is not None:
+                    self.fan_out(due, seats, now)
+            if next_at is not None:
+                await asyncio.sleep(max(next_at - time.monotonic(), 0.0))
+                self._wake.set()
+
+    def fan_out(self, event_ids: List[int], seats: dict, now: float):
+        for event_id in event_ids:
+            watchers = self.subscribers.get(event_id)
+            if not watchers:
+                continue
+            self.sent_at[event_id] = now
+            count = seats.get(event_id)
+            for subscription in watchers:
+                subscription.deliver(event_id, count)
+            self.delivered += len(watchers)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.count,
+            "events": len(self.subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+seat_hub = SeatHub()
+
+def sse_message(event_id: int, seats) -> bytes:
+    data = json.dumps({"event_id": event_id, "seats": seats}, separators=(",", ":"))
+    return f"event: seats\ndata: {data}\n\n".encode()
+
+async def stream(subscription: Subscription, snapshot: dict):
+    try:
+        for event_id in subscription.event_ids:
+            if event_id in snapshot:
+                yield sse_message(event_id, snapshot[event_id])
+        while True:
+            try:
+                await asyncio.wait_for(subscription.wake.wait(), LIVE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            for event_id, seats in subscription.drain().items():
+                yield sse_message(event_id, seats)
+    finally:
+        seat_hub.unsubscribe(subscription)
+
+async def stream_response(event_ids: List[int]) -> StreamingResponse:
+    event_ids = list(dict.fromkeys(event_ids))
+    if len(event_ids) > LIVE_MAX_EVENTS:
+        raise HTTPException(status_code=400, detail=f"At most {LIVE_MAX_EVENTS} events per stream")
+    subscription = seat_hub.subscribe(event_ids)
+    try:
+        snapshot = await run_in_threadpool(load_seats, event_ids)
+    except BaseException:
+        seat_hub.unsubscribe(subscription)
+        raise
+    if not snapshot:
+        seat_hub.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Event not found")
+    return StreamingResponse(stream(subscription, snapshot), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,121 @@
+import argparse
+import json
+import sys
+from database import Base, SessionLocal, engine
+import models  # noqa: F401
+import bulk
+import migrations
+import ratings
+import search
+
+def migrate(args):
+    if args.list:
+        db = SessionLocal()
+        try:
+            pending = migrations.pending_migrations(db)
+        finally:
+            db.close()
+        for version, name in pending:
+            print(f"pending {version:04d} {name}")
+        if not pending:
+            print("Database schema is up to date")
+        return
+    applied = migrations.migrate(engine)
+    for version, name in applied:
+        print(f"applied {version:04d} {name}")
+    if not applied:
+        print("Database schema is up to date")
+
+def rebuild_ratings(args):
+    db = SessionLocal()
+    try:
+        count = ratings.rebuild_ratings(db)
+    finally:
+        db.close()
+    print(f"Rebuilt rating aggregates for {count} events")
+
+def rebuild_search(args):
+    search.init_search(engine)
+    search.rebuild_search_index(engine)
+    print("Rebuilt search index")
+
+def detect_format(args) -> str:
+    if args.format:
+        return args.format
+    return "csv" if args.file.endswith(".csv") else "ndjson"
+
+def run_import(args, load):
+    report = bulk.ImportReport()
+    db = SessionLocal()
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as source:
+            for batch in bulk.read_batches(source, detect_format(args), args.batch_size):
+                load(db, batch, report)
+    finally:
+        db.close()
+    print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+    return 1 if report.failed else 0
+
+def import_events(args):
+    return run_import(args, lambda db, batch, report: bulk.import_events(db, batch, args.owner_id, report))
+
+def import_bookings(args):
+    return run_import(args, lambda db, batch, report: bulk.import_bookings(db, batch, args.user_id, True, report))
+
+def run_export(args, kind):
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in bulk.export_rows(kind, args.format or "ndjson"):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+def export_events(args):
+    run_export(args, "events")
+
+def export_bookings(args):
+    run_export(args, "bookings")
+
+COMMANDS = {
+    "migrate": migrate,
+    "rebuild-ratings": rebuild_ratings,
+    "rebuild-search": rebuild_search,
+    "import-events": import_events,
+    "import-bookings": import_bookings,
+    "export-events": export_events,
+    "export-bookings": export_bookings,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event Booking System management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate_parser.add_argument("--list", action="store_true", help="only list pending migrations")
+    commands.add_parser("rebuild-ratings", help="recompute event rating aggregates from reviews")
+    commands.add_parser("rebuild-search", help="rebuild the full-text search index")
+
+    events = commands.add_parser("import-events", help="import events from an NDJSON or CSV file")
+    events.add_argument("file")
+    events.add_argument("--owner-id", type=int, required=True)
+    bookings = commands.add_parser("import-bookings", help="import bookings from an NDJSON or CSV file")
+    bookings.add_argument("file")
+    bookings.add_argument("--user-id", type=int, required=True, help="owner of rows without user_id")
+    for sub in (events, bookings):
+        sub.add_argument("--format", choices=bulk.FORMATS)
+        sub.add_argument("--batch-size", type=int, default=bulk.BULK_BATCH_SIZE)
+
+    for name in ("export-events", "export-bookings"):
+        sub = commands.add_parser(name, help=f"stream {name.split('-')[1]} as NDJSON or CSV")
+        sub.add_argument("--format", choices=bulk.FORMATS)
+        sub.add_argument("--output", "-o")
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    if args.command != "migrate":
+        migrations.migrate(engine)
+    search.init_search(engine)
+    return COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+logger = logging.getLogger(__name__)
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if SLOW_REQUEST_MS > 0 else None
+
+_request = ContextVar("request_stats", default=None)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = format_labels(label_names, labels)
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{format_labels(label_names, labels, le=bound)} {cumulative}")
+            lines.append(f'{self.name}_bucket{format_labels(label_names, labels, le="+Inf")} {count}')
+            lines.append(f"{self.name}_sum{base} {total}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+def format_labels(names: tuple, values: tuple, le=None) -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = Histogram("http_request_duration_seconds", "Request latency by route", LATENCY_BUCKETS)
+        self.request_queries = Histogram("http_request_db_queries", "SQL statements per request", QUERY_BUCKETS)
+        self.request_db = Histogram("http_request_db_seconds", "Time spent in SQL per request", LATENCY_BUCKETS)
+        self.bcrypt = Histogram("bcrypt_seconds", "Password hashing and verification time", LATENCY_BUCKETS)
+        self.signature = Histogram("signature_verify_seconds", "Request signature verification time", LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow_requests = 0
+
+    def observe_request(self, method: str, route: str, status_code: int, elapsed: float, stats: RequestStats,
+                        slow: bool = False):
+        with self._lock:
+            self.slow_requests += slow
+            key = (method, route, str(status_code))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe((method, route), elapsed)
+            self.request_queries.observe((method, route), stats.queries)
+            self.request_db.observe((method, route), stats.db_seconds)
+
+    def observe_query(self, elapsed: float):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += elapsed
+
+    def observe_bcrypt(self, operation: str, elapsed: float):
+        with self._lock:
+            self.bcrypt.observe((operation,), elapsed)
+
+    def observe_signature(self, elapsed: float):
+        with self._lock:
+            self.signature.observe((), elapsed)
+
+    def render(self, gauges: dict = None) -> str:
+        with self._lock:
+            lines = ["# HELP http_requests_total Requests by route and status", "# TYPE http_requests_total counter"]
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{format_labels(('method', 'route', 'status'), labels)} {count}")
+            lines += self.latency.render(("method", "route"))
+            lines += self.request_queries.render(("method", "route"))
+            lines += self.request_db.render(("method", "route"))
+            lines += self.bcrypt.render(("operation",))
+            lines += self.signature.render(())
+            counters = {
+                "db_queries_total": self.queries,
+                "db_query_seconds_total": self.db_seconds,
+                "slow_requests_total": self.slow_requests,
+            }
+        for name, value in counters.items():
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def observe_bcrypt(operation: str, elapsed: float):
+    if METRICS_ENABLED:
+        metrics.observe_bcrypt(operation, elapsed)
+
+def observe_signature(elapsed: float):
+    if METRICS_ENABLED:
+        metrics.observe_signature(elapsed)
+
+def install_engine_hooks(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        metrics.observe_query(elapsed)
+        stats = _request.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+            stats.statements.append((elapsed, " ".join(statement.split())))
+
+def route_name(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def log_slow_request(method: str, path: str, status_code: int, elapsed: float, stats: RequestStats):
+    lines = [f"{elapsed * 1000:.1f} ms {method} {path} -> {status_code}: "
+             f"{stats.queries} queries, {stats.db_seconds * 1000:.1f} ms in SQL"]
+    for query_elapsed, statement in stats.statements:
+        lines.append(f"  {query_elapsed * 1000:7.2f} ms  {statement}")
+    if stats.queries > len(stats.statements):
+        lines.append(f"  ... {stats.queries - len(stats.statements)} more")
+    logger.warning("\n".join(lines))
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _request.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request.reset(token)
+            slow = SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS
+            metrics.observe_request(scope["method"], route_name(scope), status_code, elapsed, stats, slow)
+            if slow:
+                log_slow_request(scope["method"], scope["path"], status_code, elapsed, stats)
@@ -0,0 +1,218 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, func, insert, inspect, literal, select, text, update
+from sqlalchemy.schema import AddConstraint, CreateColumn, CreateTable
+from sqlalchemy.orm import Session
+from database import Base
+from models import (ArchivedBooking, ArchivedEvent, ArchivedReview, Booking, CacheVersion, Event, EventRating, Review,
+                    SchemaMigration, SeatHold, User)
+from reservations import release_seats_many
+import ratings
+import search
+
+MIGRATIONS = []
+
+logger = logging.getLogger(__name__)
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+def create_model_indexes(db: Session):
+    connection = db.connection()
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        if not existing.issuperset(table.columns.keys()):
+            continue
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def recreate_index(db: Session, index):
+    connection = db.connection()
+    index.drop(connection, checkfirst=True)
+    index.create(connection)
+
+def add_missing_column(db: Session, column):
+    connection = db.connection()
+    existing = {c["name"] for c in inspect(connection).get_columns(column.table.name)}
+    if column.name not in existing:
+        ddl = CreateColumn(column).compile(dialect=connection.dialect)
+        connection.exec_driver_sql(f"ALTER TABLE {column.table.name} ADD COLUMN {ddl}")
+
+def rebuild_table(db: Session, table):
+    connection = db.connection()
+    new = f"_{table.name}_new"
+    existing = {c["name"] for c in inspect(connection).get_columns(table.name)}
+    columns = ", ".join(c.name for c in table.columns if c.name in existing)
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(ddl.replace(f"CREATE TABLE {table.name} (", f"CREATE TABLE {new} (", 1))
+    connection.exec_driver_sql(f"INSERT INTO {new} ({columns}) SELECT {columns} FROM {table.name}")
+    connection.exec_driver_sql(f"DROP TABLE {table.name}")
+    connection.exec_driver_sql(f"ALTER TABLE {new} RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(connection)
+    violations = connection.exec_driver_sql(f"PRAGMA foreign_key_check({table.name})").all()
+    if violations:
+        raise RuntimeError(f"{table.name}: {len(violations)} rows violate foreign keys after rebuild")
+
+def reserve_archived_ids(db: Session, model, archive):
+    top = db.scalar(select(func.max(archive.id)))
+    if top is None:
+        return
+    params = {"name": model.__tablename__, "top": top}
+    db.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT :name, 0 "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"), params)
+    db.execute(text("UPDATE sqlite_sequence SET seq = :top WHERE name = :name AND seq < :top"), params)
+
+def table_sql(db: Session, name: str) -> str:
+    return db.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                      {"name": name}).scalar() or ""
+
+def move_to_archive(db: Session, model, archive, *where) -> int:
+    archive.__table__.create(db.connection(), checkfirst=True)
+    existing = {c["name"] for c in inspect(db.connection()).get_columns(model.__tablename__)}
+    columns = [c.name for c in archive.__table__.columns
+               if c.name in existing and c.name not in ("deleted_at", "archived_at")]
+    now = datetime.utcnow()
+    rows = select(*(model.__table__.c[name] for name in columns), literal(now), literal(now)).where(*where)
+    moved = db.execute(insert(archive).from_select(columns + ["deleted_at", "archived_at"], rows)).rowcount
+    if moved:
+        db.execute(delete(model).where(*where).execution_options(synchronize_session=False))
+    return moved
+
+def remove_orphans(db: Session):
+    users = select(User.id)
+    events = select(Event.id)
+    gone_event = (Booking.event_id.is_(None) | Booking.event_id.not_in(events),)
+    gone_user = (Booking.event_id.in_(events), Booking.user_id.is_(None) | Booking.user_id.not_in(users))
+    released = defaultdict(int)
+    for event_id, seats in db.execute(select(Booking.event_id, Booking.seats).where(*gone_user)):
+        released[event_id] += seats
+    held = delete(SeatHold).where(SeatHold.event_id.in_(events), SeatHold.status == "held",
+                                  SeatHold.user_id.is_(None) | SeatHold.user_id.not_in(users))
+    for event_id, seats in db.execute(held.returning(SeatHold.event_id, SeatHold.seats)):
+        released[event_id] += seats
+    release_seats_many(db, released)
+    moved = {
+        "bookings": move_to_archive(db, Booking, ArchivedBooking, *gone_event)
+        + move_to_archive(db, Booking, ArchivedBooking, *gone_user),
+        "reviews": move_to_archive(db, Review, ArchivedReview, Review.event_id.is_(None) | Review.event_id.not_in(events)),
+    }
+    for model in (SeatHold, EventRating):
+        db.execute(delete(model).where(model.event_id.is_(None) | model.event_id.not_in(events)))
+    db.execute(delete(SeatHold).where(SeatHold.user_id.is_(None) | SeatHold.user_id.not_in(users)))
+    db.execute(update(Review).where(Review.user_id.not_in(users)).values(user_id=None))
+    for table, count in moved.items():
+        if count:
+            logger.warning("Moved %d orphaned %s to archived_%s", count, table, table)
+
+def replace_foreign_keys(db: Session, table):
+    connection = db.connection()
+    for fk in inspect(connection).get_foreign_keys(table.name):
+        if fk["name"]:
+            connection.exec_driver_sql(f'ALTER TABLE {table.name} DROP CONSTRAINT "{fk["name"]}"')
+    for constraint in table.foreign_key_constraints:
+        connection.execute(AddConstraint(constraint))
+
+@migration(1, "review_is_edited")
+def review_is_edited(db: Session):
+    add_missing_column(db, Review.__table__.c.is_edited)
+
+@migration(2, "crud_indexes")
+def crud_indexes(db: Session):
+    keep = (
+        select(func.min(Review.id))
+        .where(Review.user_id.is_not(None), Review.event_id.is_not(None))
+        .group_by(Review.user_id, Review.event_id)
+    )
+    archived = move_to_archive(db, Review, ArchivedReview, Review.user_id.is_not(None), Review.event_id.is_not(None),
+                               Review.id.not_in(keep))
+    if archived:
+        logger.warning("Moved %d duplicate reviews to archived_reviews before creating uq_reviews_user_id_event_id",
+                       archived)
+    create_model_indexes(db)
+
+@migration(3, "availability_indexes")
+def availability_indexes(db: Session):
+    create_model_indexes(db)
+
+@migration(4, "cache_versions")
+def cache_versions(db: Session):
+    CacheVersion.__table__.create(db.connection(), checkfirst=True)
+    if db.get(CacheVersion, "categories") is None:
+        db.add(CacheVersion(name="categories", version=0))
+
+@migration(5, "delete_constraints")
+def delete_constraints(db: Session):
+    remove_orphans(db)
+    for model in (Booking, Review, SeatHold, EventRating):
+        if db.connection().dialect.name == "sqlite":
+            rebuild_table(db, model.__table__)
+        else:
+            replace_foreign_keys(db, model.__table__)
+
+@migration(6, "soft_delete")
+def soft_delete(db: Session):
+    for model in (ArchivedEvent, ArchivedBooking, ArchivedReview):
+        model.__table__.create(db.connection(), checkfirst=True)
+    if db.connection().dialect.name == "sqlite":
+        for model in (Event, Booking, Review):
+            if "AUTOINCREMENT" not in table_sql(db, model.__tablename__).upper():
+                rebuild_table(db, model.__table__)
+        for model, archive in ((Event, ArchivedEvent), (Booking, ArchivedBooking), (Review, ArchivedReview)):
+            reserve_archived_ids(db, model, archive)
+        if inspect(db.connection()).has_table(search.FTS_TABLE):
+            for statement in search.FTS_SETUP[1:]:
+                db.execute(text(statement))
+    else:
+        for model in (Event, Booking, Review):
+            add_missing_column(db, model.__table__.c.deleted_at)
+            for index in model.__table__.indexes:
+                if index.dialect_options["postgresql"]["where"] is not None:
+                    recreate_index(db, index)
+    create_model_indexes(db)
+    ratings.rebuild_ratings(db)
+
+@migration(7, "events_cache_version")
+def events_cache_version(db: Session):
+    if db.get(CacheVersion, "events") is None:
+        db.add(CacheVersion(name="events", version=0))
+
+def applied_versions(db: Session) -> set:
+    return set(db.scalars(select(SchemaMigration.version)))
+
+def pending_migrations(db: Session) -> list:
+    applied = applied_versions(db)
+    return [(version, name) for version, name, _ in sorted(MIGRATIONS) if version not in applied]
+
+def migrate(engine) -> list:
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    applied = []
+    with engine.connect() as connection:
+        foreign_keys = None
+        if connection.dialect.name == "sqlite":
+            foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        try:
+            with Session(connection) as db:
+                done = applied_versions(db)
+                for version, name, fn in sorted(MIGRATIONS):
+                    if version in done:
+                        continue
+                    fn(db)
+                    db.add(SchemaMigration(version=version, name=name, applied_at=datetime.utcnow()))
+                    db.commit()
+                    applied.append((version, name))
+        finally:
+            if foreign_keys is not None:
+                connection.rollback()
+                connection.exec_driver_sql(f"PRAGMA foreign_keys={foreign_keys}")
+                connection.commit()
+    return applied
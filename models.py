@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import secrets
@@ -11,16 +11,16 @@ class User(Base):
     api_key = Column(String, unique=True)
     role = Column(String, default="user")
 
-    events = relationship("Event", back_populates="owner")
-    bookings = relationship("Booking", back_populates="user")
-    reviews = relationship("Review", back_populates="user")
+    events = relationship("Event", back_populates="owner", passive_deletes=True)
+    bookings = relationship("Booking", back_populates="user", passive_deletes=True)
+    reviews = relationship("Review", back_populates="user", passive_deletes=True)
 
 class Category(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
 
-    events = relationship("Event", back_populates="category")
+    events = relationship("Event", back_populates="category", passive_deletes=True)
 
 class Event(Base):
     __tablename__ = "events"
@@ -28,32 +28,156 @@ class Event(Base):
     title = Column(String, index=True)
     date = Column(DateTime)
     seats = Column(Integer)
-    category_id = Column(Integer, ForeignKey("categories.id"))
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="RESTRICT"), index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="RESTRICT"))
+    deleted_at = Column(DateTime)
 
     category = relationship("Category", back_populates="events")
     owner = relationship("User", back_populates="events")
-    bookings = relationship("Booking", back_populates="event")
-    reviews = relationship("Review", back_populates="event")
+    bookings = relationship("Booking", back_populates="event", passive_deletes=True)
+    reviews = relationship("Review", back_populates="event", passive_deletes=True)
+    rating = relationship("EventRating", uselist=False, lazy="joined", viewonly=True)
+
+    @property
+    def review_count(self):
+        return self.rating.review_count if self.rating else 0
+
+    @property
+    def average_rating(self):
+        return self.rating.average if self.rating else None
+
+    __table_args__ = (
+        Index("ix_events_date_id", "date", "id", sqlite_where=deleted_at.is_(None),
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_events_category_id_date_id", "category_id", "date", "id", sqlite_where=deleted_at.is_(None),
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_events_seats_id", "seats", "id", sqlite_where=deleted_at.is_(None),
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_events_deleted_at", "deleted_at", sqlite_where=deleted_at.is_not(None),
+              postgresql_where=deleted_at.is_not(None)),
+        {"sqlite_autoincrement": True},
+    )
 
 class Booking(Base):
     __tablename__ = "bookings"
     id = Column(Integer, primary_key=True, index=True)
     seats = Column(Integer)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    event_id = Column(Integer, ForeignKey("events.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), index=True)
+    deleted_at = Column(DateTime)
 
     user = relationship("User", back_populates="bookings")
     event = relationship("Event", back_populates="bookings")
 
+    __table_args__ = (
+        Index("ix_bookings_user_id_event_id", "user_id", "event_id", sqlite_where=deleted_at.is_(None),
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_bookings_deleted_at", "deleted_at", sqlite_where=deleted_at.is_not(None),
+              postgresql_where=deleted_at.is_not(None)),
+        {"sqlite_autoincrement": True},
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String)
     rating = Column(Float)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    event_id = Column(Integer, ForeignKey("events.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), index=True)
     is_edited = Column(Integer, default=0)
+    deleted_at = Column(DateTime)
 
     user = relationship("User", back_populates="reviews")
     event = relationship("Event", back_populates="reviews")
+
+    __table_args__ = (
+        Index("uq_reviews_user_id_event_id", "user_id", "event_id", unique=True, sqlite_where=deleted_at.is_(None),
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_reviews_deleted_at", "deleted_at", sqlite_where=deleted_at.is_not(None),
+              postgresql_where=deleted_at.is_not(None)),
+        {"sqlite_autoincrement": True},
+    )
+
+class ExpiringKey(Base):
+    __tablename__ = "expiring_keys"
+    namespace = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    expires_at = Column(Float, index=True)
+
+class EventRating(Base):
+    __tablename__ = "event_ratings"
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Float, default=0.0, nullable=False)
+    rating_min = Column(Float)
+    rating_max = Column(Float)
+    stars_1 = Column(Integer, default=0, nullable=False)
+    stars_2 = Column(Integer, default=0, nullable=False)
+    stars_3 = Column(Integer, default=0, nullable=False)
+    stars_4 = Column(Integer, default=0, nullable=False)
+    stars_5 = Column(Integer, default=0, nullable=False)
+
+    @property
+    def average(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f"stars_{star}") for star in range(1, 6)}
+
+class SeatHold(Base):
+    __tablename__ = "seat_holds"
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    seats = Column(Integer)
+    status = Column(String, default="waiting")
+    expires_at = Column(DateTime)
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_seat_holds_event_id_status", "event_id", "status"),
+        Index("ix_seat_holds_status_expires_at", "status", "expires_at"),
+    )
+
+class ArchivedEvent(Base):
+    __tablename__ = "archived_events"
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    date = Column(DateTime)
+    seats = Column(Integer)
+    category_id = Column(Integer)
+    owner_id = Column(Integer)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime)
+
+class ArchivedBooking(Base):
+    __tablename__ = "archived_bookings"
+    id = Column(Integer, primary_key=True)
+    seats = Column(Integer)
+    user_id = Column(Integer, index=True)
+    event_id = Column(Integer, index=True)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime)
+
+class ArchivedReview(Base):
+    __tablename__ = "archived_reviews"
+    id = Column(Integer, primary_key=True)
+    text = Column(String)
+    rating = Column(Float)
+    user_id = Column(Integer)
+    event_id = Column(Integer, index=True)
+    is_edited = Column(Integer)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime)
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    name = Column(String)
+    applied_at = Column(DateTime)
@@ -0,0 +1,97 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+def page_limit(default: int):
+    def limit(limit: int = default) -> int:
+        return max(1, min(limit, MAX_PAGE_SIZE))
+    return limit
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values[0]
+
+def decode_event_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        date_str, event_id = values
+        return datetime.fromisoformat(date_str), int(event_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+EVENT_SORT_VALUES = {"date": datetime.fromisoformat, "seats": int}
+
+def decode_event_sort_cursor(cursor: Optional[str], sort: str) -> Optional[tuple]:
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        value, event_id = values
+        return EVENT_SORT_VALUES[sort.lstrip("-")](value), int(event_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_search_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        score, event_id = values
+        return float(score), int(event_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_cursor(items: Sequence, limit: int, key: Callable) -> Optional[str]:
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(*key(items[-1]))
+
+def next_cursor_headers(items: Sequence, limit: int, key: Callable) -> dict:
+    cursor = next_cursor(items, limit, key)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+def set_next_cursor(response: Response, items: Sequence, limit: int, key: Callable) -> Optional[str]:
+    cursor = next_cursor(items, limit, key)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
+
+def event_key(event):
+    return event.date, event.id
+
+def event_sort_key(sort: str) -> Callable:
+    field = sort.lstrip("-")
+    return lambda row: (getattr(row, field), row.id)
+
+def id_key(item):
+    return (item.id,)
+
+def review_key(review: dict):
+    return (review["id"],)
+
+def search_key(row):
+    return row.score, row.Event.id
@@ -0,0 +1,94 @@
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from models import EventRating, Review
+
+STARS = range(1, 6)
+
+def star_bucket(rating: float) -> int:
+    return max(1, min(5, int(rating + 0.5)))
+
+def _star_column(rating: float):
+    return getattr(EventRating, f"stars_{star_bucket(rating)}")
+
+def add_rating(db: Session, event_id: int, rating: float):
+    star = _star_column(rating)
+    updated = db.execute(
+        update(EventRating)
+        .where(EventRating.event_id == event_id)
+        .values({
+            EventRating.review_count: EventRating.review_count + 1,
+            EventRating.rating_sum: EventRating.rating_sum + rating,
+            EventRating.rating_min: case(
+                (EventRating.rating_min.is_(None) | (EventRating.rating_min > rating), rating),
+                else_=EventRating.rating_min,
+            ),
+            EventRating.rating_max: case(
+                (EventRating.rating_max.is_(None) | (EventRating.rating_max < rating), rating),
+                else_=EventRating.rating_max,
+            ),
+            star: star + 1,
+        })
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if updated == 0:
+        values = {f"stars_{s}": 0 for s in STARS}
+        values[f"stars_{star_bucket(rating)}"] = 1
+        db.execute(insert(EventRating).values(
+            event_id=event_id, review_count=1, rating_sum=rating, rating_min=rating, rating_max=rating, **values
+        ))
+
+def remove_rating(db: Session, event_id: int, rating: float):
+    star = _star_column(rating)
+    db.execute(
+        update(EventRating)
+        .where(EventRating.event_id == event_id)
+        .values({
+            EventRating.review_count: EventRating.review_count - 1,
+            EventRating.rating_sum: EventRating.rating_sum - rating,
+            star: star - 1,
+        })
+        .execution_options(synchronize_session=False)
+    )
+    bounds = db.execute(
+        select(EventRating.rating_min, EventRating.rating_max).where(EventRating.event_id == event_id)
+    ).first()
+    if bounds is not None and rating in (bounds.rating_min, bounds.rating_max):
+        db.flush()
+        low, high = db.execute(
+            select(func.min(Review.rating), func.max(Review.rating))
+            .where(Review.event_id == event_id, Review.deleted_at.is_(None))
+        ).one()
+        db.execute(
+            update(EventRating)
+            .where(EventRating.event_id == event_id)
+            .values(rating_min=low, rating_max=high)
+            .execution_options(synchronize_session=False)
+        )
+
+def get_event_rating(db: Session, event_id: int):
+    return db.query(EventRating).filter(EventRating.event_id == event_id).first()
+
+def rebuild_ratings(db: Session) -> int:
+    bucket = case(*((Review.rating < s + 0.5, s) for s in range(1, 5)), else_=5)
+    aggregates = (
+        select(
+            Review.event_id,
+            func.count(Review.id),
+            func.sum(Review.rating),
+            func.min(Review.rating),
+            func.max(Review.rating),
+            *(func.sum(case((bucket == s, 1), else_=0)) for s in STARS),
+        )
+        .where(Review.event_id.is_not(None), Review.rating.is_not(None), Review.deleted_at.is_(None))
+        .group_by(Review.event_id)
+    )
+    db.execute(delete(EventRating))
+    columns = ["event_id", "review_count", "rating_sum", "rating_min", "rating_max"] + [f"stars_{s}" for s in STARS]
+    db.execute(insert(EventRating).from_select(columns, aggregates))
+    db.commit()
+    return db.query(EventRating).count()
+
+def init_ratings(engine):
+    with Session(engine) as db:
+        if db.query(EventRating.event_id).first() is None and db.query(Review.id).first() is not None:
+            rebuild_ratings(db)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager, nullcontext
+from datetime import datetime
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from database import env_flag
+from models import Event
+
+RESERVATION_LOCKS = env_flag("RESERVATION_LOCKS", "1")
+RESERVATION_LOCK_STRIPES = int(os.getenv("RESERVATION_LOCK_STRIPES", "64"))
+
+_stripes = [threading.Lock() for _ in range(max(RESERVATION_LOCK_STRIPES, 1))]
+_async_stripes = [asyncio.Lock() for _ in range(len(_stripes))]
+
+def event_lock(event_id: int):
+    if not RESERVATION_LOCKS:
+        return nullcontext()
+    return _stripes[event_id % len(_stripes)]
+
+def async_event_lock(event_id: int):
+    if not RESERVATION_LOCKS:
+        return nullcontext()
+    return _async_stripes[event_id % len(_async_stripes)]
+
+def busy_stripes() -> int:
+    return sum(stripe.locked() for stripe in _stripes)
+
+def _stripe_indexes(event_ids) -> list:
+    return sorted({event_id % len(_stripes) for event_id in event_ids})
+
+@contextmanager
+def events_lock(event_ids):
+    with ExitStack() as stack:
+        if RESERVATION_LOCKS:
+            for index in _stripe_indexes(event_ids):
+                stack.enter_context(_stripes[index])
+        yield
+
+@asynccontextmanager
+async def async_events_lock(event_ids):
+    async with AsyncExitStack() as stack:
+        if RESERVATION_LOCKS:
+            for index in _stripe_indexes(event_ids):
+                await stack.enter_async_context(_async_stripes[index])
+        yield
+
+def reserve_seats(db: Session, event_id: int, seats: int, *where) -> bool:
+    stmt = (
+        update(Event)
+        .where(Event.id == event_id, Event.seats >= seats, Event.date > datetime.utcnow(),
+               Event.deleted_at.is_(None), *where)
+        .values(seats=Event.seats - seats)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount == 1
+
+def release_seats(db: Session, event_id: int, seats: int) -> bool:
+    stmt = (
+        update(Event)
+        .where(Event.id == event_id)
+        .values(seats=Event.seats + seats)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount == 1
+
+def reserve_seats_many(db: Session, seats_by_event: dict, *where) -> bool:
+    events = Event.__table__
+    stmt = (
+        events.update()
+        .where(events.c.id == bindparam("event"), events.c.seats >= bindparam("taken"),
+               events.c.date > datetime.utcnow(), events.c.deleted_at.is_(None), *where)
+        .values(seats=events.c.seats - bindparam("taken"))
+    )
+    params = [{"event": event_id, "taken": seats} for event_id, seats in sorted(seats_by_event.items())]
+    return db.execute(stmt, params).rowcount == len(params)
+
+def release_seats_many(db: Session, seats_by_event: dict) -> int:
+    events = Event.__table__
+    stmt = (
+        events.update()
+        .where(events.c.id == bindparam("event"))
+        .values(seats=events.c.seats + bindparam("released"))
+    )
+    params = [{"event": event_id, "released": seats} for event_id, seats in sorted(seats_by_event.items())]
+    return db.execute(stmt, params).rowcount if params else 0
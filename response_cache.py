@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy.exc import SQLAlchemyError
+from cache import TTLCache
+from categories import bump_version, read_version
+from database import SessionLocal
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_VERSION_CHECK = float(os.getenv("RESPONSE_CACHE_VERSION_CHECK", "1"))
+
+logger = logging.getLogger(__name__)
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, body: bytes, etag: str, headers: dict):
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class ResponseCache:
+    def __init__(self, maxsize: int, ttl: float, check_interval: float = RESPONSE_CACHE_VERSION_CHECK,
+                 session_factory=SessionLocal):
+        self.entries = TTLCache(maxsize, ttl)
+        self.check_interval = check_interval
+        self.session_factory = session_factory
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self.checks = 0
+        self._generations = {}
+        self._versions = {}
+        self._checked_at = {}
+        self._pending = set()
+        self._publisher = None
+        self._published_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def invalidate(self, *scopes: str):
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            self._pending.update(scopes)
+            if self._publisher is None:
+                delay = max(0.0, self._published_at + self.check_interval - time.monotonic())
+                self._publisher = threading.Timer(delay, self.publish)
+                self._publisher.daemon = True
+                self._publisher.start()
+
+    def publish(self):
+        with self._lock:
+            scopes, self._pending = self._pending, set()
+            self._publisher = None
+            self._published_at = time.monotonic()
+        if not scopes:
+            return
+        try:
+            with self.session_factory() as db:
+                for scope in sorted(scopes):
+                    bump_version(db, scope)
+                db.commit()
+        except SQLAlchemyError:
+            logger.exception("Failed to publish response cache invalidation for %s", ", ".join(sorted(scopes)))
+
+    def version_due(self, scope: str) -> bool:
+        checked_at = self._checked_at.get(scope)
+        return checked_at is None or time.monotonic() - checked_at >= self.check_interval
+
+    def check_version(self, scope: str) -> int:
+        with self.session_factory() as db:
+            version = read_version(db, scope)
+        with self._lock:
+            self._versions[scope] = version
+            self._checked_at[scope] = time.monotonic()
+            self.checks += 1
+        return version
+
+    def key(self, scope: str, request: Request):
+        return (scope, self._generations.get(scope, 0), self._versions.get(scope, 0), request.url.path,
+                tuple(sorted(request.query_params.multi_items())))
+
+    def store(self, key, content, adapter: Optional[TypeAdapter], headers: dict = None) -> CachedResponse:
+        body = content if adapter is None else adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        entry = CachedResponse(body, make_etag(body), headers or {})
+        self.entries.set(key, entry)
+        return entry
+
+    def render(self, request: Request, entry: CachedResponse) -> Response:
+        headers = dict(entry.headers, ETag=entry.etag)
+        headers["Cache-Control"] = "no-cache"
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self.not_modified += 1
+                self.bytes_saved += len(entry.body)
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    async def respond_async(self, request: Request, scope: str, load, adapter: Optional[TypeAdapter] = None) -> Response:
+        if self.version_due(scope):
+            await run_in_threadpool(self.check_version, scope)
+        key = self.key(scope, request)
+        entry = self.entries.get(key)
+        if entry is None:
+            content, headers = await load()
+            entry = self.store(key, content, adapter, headers)
+        return self.render(request, entry)
+
+    def stats(self) -> dict:
+        return dict(self.entries.stats(), not_modified=self.not_modified, bytes_saved=self.bytes_saved,
+                    version_checks=self.checks)
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
@@ -0,0 +1,400 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import User
+from schemas import *
+from auth import create_access_token, oauth2_scheme, revoke_token
+from dependencies import get_session
+from pagination import (decode_event_cursor, decode_event_sort_cursor, decode_id_cursor, decode_search_cursor,
+                        event_key, event_sort_key, id_key, next_cursor_headers, page_limit, review_key, search_key,
+                        set_next_cursor)
+from response_cache import response_cache
+from fast_json import dump_rows, rows_response
+from signature import verify_signature, require_admin
+from crud import BOOKING_FAILURES, DELETE_FAILURES, EVENT_UPDATE_FIELDS
+import bulk
+import crud_async as crud
+import hashing
+import live
+
+router = APIRouter()
+
+@router.post("/auth/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_session)):
+    if await crud.get_user_by_username(db, user.username):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    hashed = await hashing.hash_password(user.password)
+    return await crud.create_user(db, user, hashed)
+
+@router.post("/auth/login")
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_session)):
+    user = await crud.get_user_by_username(db, form.username)
+    if not user or not await hashing.verify_password(form.password, user.password):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    token = create_access_token(data={"sub": str(user.id)})
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "api_key": user.api_key,
+        "role": user.role,
+        "username": user.username,
+        "user_id": user.id,
+    }
+
+@router.post("/auth/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    await run_in_threadpool(revoke_token, token)
+    return {"message": "Logout successful"}
+
+@router.get("/users/me", response_model=UserResponse)
+async def read_me(current_user: User = Depends(verify_signature)):
+    return current_user
+
+@router.get("/users", response_model=List[UserResponse])
+async def list_users(skip: int = 0, limit: int = Depends(page_limit(100)),
+                     cursor: Optional[str] = None, db: AsyncSession = Depends(get_session),
+                     current_user: User = Depends(require_admin)):
+    users = await crud.get_user_rows(db, skip, limit, decode_id_cursor(cursor))
+    return rows_response(users, next_cursor_headers(users, limit, id_key))
+
+@router.get("/users/{user_id}", response_model=UserResponse)
+async def get_user_detail(user_id: int, db: AsyncSession = Depends(get_session),
+                          current_user: User = Depends(verify_signature)):
+    user = await crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if current_user.id != user_id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return user
+
+@router.patch("/users/{user_id}", response_model=UserResponse)
+async def update_user_endpoint(user_id: int, data: UserUpdate, db: AsyncSession = Depends(get_session),
+                               current_user: User = Depends(verify_signature)):
+    if user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if data.role and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can change role")
+    hashed = await hashing.hash_password(data.password) if data.password else None
+    updated = await crud.update_user(db, user_id, data, hashed)
+    if not updated:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated
+
+@router.delete("/users/{user_id}", response_model=UserResponse)
+async def delete_user_endpoint(user_id: int, owned_events: str = Query("reassign", pattern="^(reassign|cascade)$"),
+                               reassign_to: Optional[int] = None, db: AsyncSession = Depends(get_session),
+                               current_user: User = Depends(verify_signature)):
+    if current_user.role != "admin" and (user_id != current_user.id or reassign_to is not None):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    deleted, failure = await crud.delete_user(db, user_id, owned_events, reassign_to)
+    if failure:
+        raise HTTPException(status_code=409, detail=DELETE_FAILURES[failure])
+    if not deleted:
+        raise HTTPException(status_code=404, detail="User not found")
+    return deleted
+
+@router.post("/categories", response_model=CategoryResponse)
+async def create_category_endpoint(item: CategoryCreate, db: AsyncSession = Depends(get_session),
+                                   current_user: User = Depends(require_admin)):
+    return await crud.create_category(db, item)
+
+@router.get("/categories", response_model=List[CategoryResponse])
+async def list_categories(request: Request, db: AsyncSession = Depends(get_session)):
+    async def load():
+        return await crud.get_categories(db), None
+    return await response_cache.respond_async(request, "categories", load, category_list_adapter)
+
+@router.delete("/categories/{category_id}", response_model=CategoryResponse)
+async def delete_category_endpoint(category_id: int, db: AsyncSession = Depends(get_session),
+                                   current_user: User = Depends(require_admin)):
+    deleted, failure = await crud.delete_category(db, category_id)
+    if failure:
+        raise HTTPException(status_code=409, detail=DELETE_FAILURES[failure])
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return deleted
+
+@router.post("/events", response_model=EventResponse)
+async def create_event_endpoint(item: EventCreate, db: AsyncSession = Depends(get_session),
+                                current_user: User = Depends(verify_signature)):
+    result = await crud.create_event(db, item, owner_id=current_user.id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return result
+
+@router.get("/events", response_model=List[EventResponse])
+async def list_events(request: Request, skip: int = 0, limit: int = Depends(page_limit(100)),
+                      cursor: Optional[str] = None, db: AsyncSession = Depends(get_session)):
+    async def load():
+        events = await crud.get_event_rows(db, skip, limit, decode_event_cursor(cursor))
+        return dump_rows(events), next_cursor_headers(events, limit, event_key)
+    return await response_cache.respond_async(request, "events", load)
+
+@router.get("/events/available", response_model=List[EventResponse])
+async def list_available_events(request: Request, category: Optional[List[str]] = Query(None),
+                                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                                min_seats: int = Query(1, ge=0), sort: str = Query("date", pattern="^-?(date|seats)$"),
+                                limit: int = Depends(page_limit(100)), cursor: Optional[str] = None,
+                                db: AsyncSession = Depends(get_session)):
+    async def load():
+        category_ids = await crud.resolve_category_ids(db, category) if category else None
+        if category_ids == []:
+            return dump_rows([]), None
+        events = await crud.get_available_event_rows(db, category_ids, date_from, date_to, min_seats, sort, limit,
+                                                     decode_event_sort_cursor(cursor, sort))
+        return dump_rows(events), next_cursor_headers(events, limit, event_sort_key(sort))
+    return await response_cache.respond_async(request, "events", load)
+
+@router.get("/events/live")
+async def stream_event_seats(event_id: List[int] = Query(...)):
+    return await live.stream_response(event_id)
+
+@router.get("/events/search", response_model=List[EventResponse])
+async def search_events(response: Response, q: str = Query(..., min_length=1),
+                        limit: int = Depends(page_limit(20)), cursor: Optional[str] = None,
+                        category: Optional[str] = None, date_from: Optional[datetime] = None,
+                        date_to: Optional[datetime] = None, db: AsyncSession = Depends(get_session)):
+    category_id = None
+    if category:
+        cat = await crud.get_category_by_name(db, category)
+        if not cat:
+            return []
+        category_id = cat.id
+    rows = await crud.search_events(db, q, limit, decode_search_cursor(cursor), category_id, date_from, date_to)
+    set_next_cursor(response, rows, limit, search_key)
+    return [row.Event for row in rows]
+
+@router.post("/events/import")
+async def import_events_endpoint(request: Request, fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                                 db: AsyncSession = Depends(get_session),
+                                 current_user: User = Depends(verify_signature)):
+    report = bulk.ImportReport()
+    async for batch in bulk.read_batches_async(request.stream(), fmt):
+        await crud.import_events(db, batch, current_user.id, report)
+    return report.as_dict()
+
+@router.get("/events/export")
+def export_events(fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")):
+    return StreamingResponse(bulk.export_rows("events", fmt), media_type=bulk.media_type(fmt))
+
+@router.get("/events/{event_id}", response_model=EventResponse)
+async def get_event_detail(event_id: int, request: Request, db: AsyncSession = Depends(get_session)):
+    async def load():
+        item = await crud.get_event(db, event_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Event not found")
+        return item, None
+    return await response_cache.respond_async(request, "events", load, event_adapter)
+
+@router.get("/events/{event_id}/stats", response_model=EventStats)
+async def get_event_stats_endpoint(event_id: int, db: AsyncSession = Depends(get_session)):
+    stats = await crud.get_event_stats(db, event_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return stats
+
+@router.patch("/events/{event_id}", response_model=EventResponse)
+async def update_event_endpoint(event_id: int, data: dict, db: AsyncSession = Depends(get_session),
+                                current_user: User = Depends(verify_signature)):
+    item = await crud.get_event(db, event_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if item.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    unknown = sorted(set(data) - set(EVENT_UPDATE_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail={"message": "Fields cannot be updated", "fields": unknown})
+    if "date" in data and isinstance(data["date"], str):
+        try:
+            data["date"] = datetime.fromisoformat(data["date"].replace("Z", "+00:00"))
+        except (ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail="Invalid date format")
+    updated = await crud.update_event(db, event_id, data)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Event not found or category not found")
+    return updated
+
+@router.delete("/events/{event_id}", response_model=EventResponse)
+async def delete_event_endpoint(event_id: int, db: AsyncSession = Depends(get_session),
+                                current_user: User = Depends(verify_signature)):
+    item = await crud.get_event(db, event_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if item.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await crud.delete_event(db, event_id)
+
+@router.post("/bookings", response_model=BookingResponse)
+async def book_event(booking: BookingCreate, db: AsyncSession = Depends(get_session),
+                     current_user: User = Depends(verify_signature)):
+    created = await crud.create_booking(db, booking, user_id=current_user.id)
+    if not created:
+        event = await crud.get_event(db, booking.event_id)
+        if not event:
+            raise HTTPException(status_code=400, detail="Событие не найдено")
+        if event.date <= datetime.utcnow():
+            raise HTTPException(status_code=400, detail="Нельзя забронировать событие, которое уже началось")
+        if await crud.waitlisted_events(db, [event.id]):
+            raise HTTPException(status_code=400, detail=BOOKING_FAILURES["waitlisted"])
+        if event.seats < booking.seats:
+            raise HTTPException(status_code=400, detail="Недостаточно свободных мест")
+        raise HTTPException(status_code=400, detail="Невозможно создать бронирование")
+    return created
+
+@router.post("/bookings/batch", response_model=List[BookingResponse])
+async def book_events(batch: BookingBatchCreate, db: AsyncSession = Depends(get_session),
+                      current_user: User = Depends(verify_signature)):
+    if any(item.seats <= 0 for item in batch.items):
+        raise HTTPException(status_code=400, detail="Количество мест должно быть положительным")
+    created, failure = await crud.create_bookings(db, batch.items, user_id=current_user.id)
+    if created is None:
+        event_id, reason = failure
+        raise HTTPException(status_code=400, detail={"event_id": event_id, "message": BOOKING_FAILURES[reason]})
+    return created
+
+@router.get("/bookings/me", response_model=List[BookingResponse])
+async def my_bookings(limit: int = Depends(page_limit(100)),
+                      cursor: Optional[str] = None, db: AsyncSession = Depends(get_session),
+                      current_user: User = Depends(verify_signature)):
+    bookings = await crud.get_user_booking_rows(db, current_user.id, limit, decode_id_cursor(cursor))
+    headers = next_cursor_headers(bookings, limit, id_key)
+    return rows_response(bookings, headers)
+
+@router.get("/bookings/history", response_model=List[BookingHistoryResponse])
+async def booking_history(limit: int = Depends(page_limit(100)),
+                          cursor: Optional[str] = None, db: AsyncSession = Depends(get_session),
+                          current_user: User = Depends(verify_signature)):
+    bookings = await crud.get_user_booking_history(db, current_user.id, limit, decode_id_cursor(cursor))
+    headers = next_cursor_headers(bookings, limit, id_key)
+    return rows_response(bookings, headers)
+
+@router.post("/bookings/import")
+async def import_bookings_endpoint(request: Request,
+                                   fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                                   db: AsyncSession = Depends(get_session),
+                                   current_user: User = Depends(verify_signature)):
+    report = bulk.ImportReport()
+    async for batch in bulk.read_batches_async(request.stream(), fmt):
+        await crud.import_bookings(db, batch, current_user.id, current_user.role == "admin", report)
+    return report.as_dict()
+
+@router.get("/bookings/export")
+def export_bookings(fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                    current_user: User = Depends(verify_signature)):
+    user_id = None if current_user.role == "admin" else current_user.id
+    return StreamingResponse(bulk.export_rows("bookings", fmt, user_id), media_type=bulk.media_type(fmt))
+
+@router.get("/bookings/{booking_id}", response_model=BookingResponse)
+async def get_booking_detail(booking_id: int, db: AsyncSession = Depends(get_session),
+                             current_user: User = Depends(verify_signature)):
+    booking = await crud.get_booking(db, booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if booking.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return booking
+
+@router.patch("/bookings/{booking_id}", response_model=BookingResponse)
+async def update_booking_endpoint(booking_id: int, data: BookingUpdate, db: AsyncSession = Depends(get_session),
+                                  current_user: User = Depends(verify_signature)):
+    allow_admin = current_user.role == "admin"
+    updated = await crud.update_booking(db, booking_id, data.dict(exclude_none=True), current_user.id,
+                                        allow_admin=allow_admin)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Booking not found or not authorized")
+    return updated
+
+@router.delete("/bookings/{booking_id}", response_model=BookingResponse)
+async def cancel_booking_endpoint(booking_id: int, db: AsyncSession = Depends(get_session),
+                                  current_user: User = Depends(verify_signature)):
+    allow_admin = current_user.role == "admin"
+    cancelled = await crud.cancel_booking(db, booking_id, current_user.id, allow_admin=allow_admin)
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return cancelled
+
+@router.post("/holds", response_model=HoldResponse)
+async def hold_seats(hold: HoldCreate, db: AsyncSession = Depends(get_session),
+                     current_user: User = Depends(verify_signature)):
+    if hold.seats <= 0:
+        raise HTTPException(status_code=400, detail="Количество мест должно быть положительным")
+    created, failure = await crud.create_hold(db, hold.event_id, hold.seats, current_user.id)
+    if created is None:
+        raise HTTPException(status_code=400, detail=BOOKING_FAILURES[failure])
+    return created
+
+@router.get("/holds/{hold_id}", response_model=HoldResponse)
+async def get_hold_detail(hold_id: int, db: AsyncSession = Depends(get_session),
+                          current_user: User = Depends(verify_signature)):
+    hold = await crud.get_hold(db, hold_id)
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if hold.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await crud.hold_response(db, hold)
+
+@router.post("/holds/{hold_id}/confirm", response_model=BookingResponse)
+async def confirm_hold_endpoint(hold_id: int, db: AsyncSession = Depends(get_session),
+                                current_user: User = Depends(verify_signature)):
+    hold = await crud.get_hold(db, hold_id)
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if hold.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    booking = await crud.confirm_hold(db, hold_id)
+    if not booking:
+        raise HTTPException(status_code=409, detail="Места не удерживаются: заявка в очереди, истекла или закрыта")
+    return booking
+
+@router.delete("/holds/{hold_id}", response_model=HoldResponse)
+async def cancel_hold_endpoint(hold_id: int, db: AsyncSession = Depends(get_session),
+                               current_user: User = Depends(verify_signature)):
+    hold = await crud.get_hold(db, hold_id)
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if hold.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    cancelled = await crud.cancel_hold(db, hold)
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Заявка уже закрыта")
+    return await crud.hold_response(db, cancelled)
+
+@router.post("/reviews", response_model=ReviewResponse)
+async def add_review(review: ReviewCreate, db: AsyncSession = Depends(get_session),
+                     current_user: User = Depends(verify_signature)):
+    result = await crud.create_review(db, review, user_id=current_user.id)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot create review: you must have a booking for this event, the event must be in the past, and you can only leave one review per event"
+        )
+    return await crud.get_review_response(db, result.id)
+
+@router.get("/reviews/event/{event_id}", response_model=List[ReviewResponse])
+async def event_reviews(event_id: int, response: Response, limit: int = Depends(page_limit(100)),
+                        cursor: Optional[str] = None, db: AsyncSession = Depends(get_session)):
+    reviews = await crud.get_event_review_responses(db, event_id, limit, decode_id_cursor(cursor))
+    set_next_cursor(response, reviews, limit, review_key)
+    return reviews
+
+@router.patch("/reviews/{review_id}", response_model=ReviewResponse)
+async def update_review_endpoint(review_id: int, data: ReviewUpdate, db: AsyncSession = Depends(get_session),
+                                 current_user: User = Depends(verify_signature)):
+    updated = await crud.update_review(db, review_id, data.dict(exclude_none=True), current_user.id,
+                                       allow_admin=False)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Review not found or not authorized")
+    return await crud.get_review_response(db, updated.id)
+
+@router.delete("/reviews/{review_id}", response_model=ReviewResponse)
+async def delete_review_endpoint(review_id: int, db: AsyncSession = Depends(get_session),
+                                 current_user: User = Depends(verify_signature)):
+    allow_admin = current_user.role == "admin"
+    deleted = await crud.delete_review(db, review_id, current_user.id, allow_admin=allow_admin)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Review not found or not authorized")
+    return deleted
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class UserCreate(BaseModel):
     username: str
@@ -44,14 +44,33 @@ class EventResponse(BaseModel):
     seats: int
     category_id: int
     owner_id: int
+    review_count: int = 0
+    average_rating: Optional[float] = None
 
     class Config:
         from_attributes = True
 
+class EventStats(BaseModel):
+    event_id: int
+    review_count: int
+    average_rating: Optional[float] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    histogram: Dict[int, int]
+
 class BookingCreate(BaseModel):
     event_id: int
     seats: int
 
+class BookingUpdate(BaseModel):
+    seats: Optional[int] = Field(None, gt=0)
+
+class BookingBatchCreate(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1, max_length=100)
+
+class BookingImport(BookingCreate):
+    user_id: Optional[int] = None
+
 class BookingResponse(BaseModel):
     id: int
     seats: int
@@ -61,16 +80,38 @@ class BookingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BookingHistoryResponse(BookingResponse):
+    deleted_at: Optional[datetime] = None
+
+class HoldCreate(BaseModel):
+    event_id: int
+    seats: int
+
+class HoldResponse(BaseModel):
+    id: int
+    event_id: int
+    seats: int
+    status: str
+    position: Optional[int] = None
+    expires_at: Optional[datetime] = None
+
 class ReviewCreate(BaseModel):
     event_id: int
     text: str
     rating: float
 
+class ReviewUpdate(BaseModel):
+    text: Optional[str] = None
+    rating: Optional[float] = None
+
+    class Config:
+        extra = "forbid"
+
 class ReviewResponse(BaseModel):
     id: int
     text: str
     rating: float
-    user_id: int
+    user_id: Optional[int] = None
     event_id: int
     is_edited: Optional[int] = 0
     username: Optional[str] = None
@@ -82,3 +123,7 @@ class ReviewResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+event_adapter = TypeAdapter(EventResponse)
+event_list_adapter = TypeAdapter(List[EventResponse])
+category_list_adapter = TypeAdapter(List[CategoryResponse])
@@ -0,0 +1,83 @@
+import re
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, column, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+from models import Event
+
+FTS_TABLE = "events_fts"
+
+FTS_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content='events', content_rowid='id', tokenize='unicode61', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+]
+
+events_fts = table(FTS_TABLE, column("rowid"))
+fts_score = func.bm25(literal_column(FTS_TABLE))
+
+def fts_enabled(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+def init_search(engine):
+    if not fts_enabled(engine):
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in FTS_SETUP:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def rebuild_search_index(engine):
+    if fts_enabled(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def match_expression(q: str) -> Optional[str]:
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_events(db: Session, q: str, limit: int = 20, after: tuple = None, category_id: int = None,
+                  date_from: datetime = None, date_to: datetime = None):
+    filters = [Event.deleted_at.is_(None)]
+    if category_id is not None:
+        filters.append(Event.category_id == category_id)
+    if date_from is not None:
+        filters.append(Event.date >= date_from)
+    if date_to is not None:
+        filters.append(Event.date <= date_to)
+
+    if fts_enabled(db.get_bind()):
+        match = match_expression(q)
+        if match is None:
+            return []
+        score = fts_score
+        query = (
+            select(Event, score.label("score"))
+            .join(events_fts, events_fts.c.rowid == Event.id)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match))
+        )
+    else:
+        score = literal(0.0)
+        query = select(Event, score.label("score")).where(Event.title.ilike(f"%{q}%"))
+
+    if after is not None:
+        after_score, after_id = after
+        filters.append(or_(score > after_score, and_(score == after_score, Event.id > after_id)))
+    query = query.where(*filters).order_by(score, Event.id).limit(limit)
+    return db.execute(query).all()
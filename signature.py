@@ -1,58 +1,217 @@
 import hashlib
 import hmac
+import os
 import time
-from typing import Dict
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl
 from fastapi import Request, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
 from models import User
-from auth import get_current_user
+from auth import cache_principal, credentials_error, ensure_not_revoked, get_current_user, get_user_id_from_token
+from cache import TTLCache, USER_CACHE_SIZE, user_cache
+from database import SessionLocal
+from expiring_keys import KeyStoreFull, create_key_store
+from metrics import METRICS_TOKEN, observe_signature
+import crud
 
-nonce_cache: Dict[str, float] = {}
 NONCE_TTL = 300
+NONCE_BACKEND = os.getenv("NONCE_BACKEND", "memory")
+NONCE_MAX_ENTRIES = int(os.getenv("NONCE_MAX_ENTRIES", "100000"))
+SIGNATURE_MAX_BODY = int(os.getenv("SIGNATURE_MAX_BODY", str(100 * 1024 * 1024)))
+SIGNATURE_SPOOL_SIZE = int(os.getenv("SIGNATURE_SPOOL_SIZE", str(1024 * 1024)))
+SIGNER_CACHE_TTL = float(os.getenv("SIGNER_CACHE_TTL", "3600"))
+REPLAY_CHUNK_SIZE = 64 * 1024
+VERIFIED_USER = "signature_user_id"
+SIGNATURE_ERROR = "signature_error"
+
+nonce_store = create_key_store(NONCE_BACKEND, "nonce", NONCE_MAX_ENTRIES)
+signers = TTLCache(USER_CACHE_SIZE, SIGNER_CACHE_TTL)
 
 def compute_body_hash(body: bytes) -> str:
     if not body:
         return ''
     return hashlib.sha256(body).hexdigest()
 
-async def verify_signature(request: Request, current_user: User = Depends(get_current_user)):
-    signature = request.headers.get("X-Signature")
-    timestamp_str = request.headers.get("X-Timestamp")
-    nonce = request.headers.get("X-Nonce")
+def body_too_large():
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body too large")
 
-    if not all([signature, timestamp_str, nonce]):
-        return current_user
+def canonical_query(query_string: bytes) -> str:
+    if not query_string:
+        return ''
+    params = dict(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
 
+def sign(api_key: str, message: str) -> str:
+    base = signers.get(api_key)
+    if base is None:
+        base = hmac.new(api_key.encode(), digestmod=hashlib.sha256)
+        signers.set(api_key, base)
+    mac = base.copy()
+    mac.update(message.encode())
+    return mac.hexdigest()
+
+def check_timestamp(timestamp_str: str) -> int:
     try:
         timestamp = int(timestamp_str)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid timestamp")
-
     current_time = int(time.time())
     if abs(current_time - timestamp) > 60:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Timestamp expired or invalid")
+    return current_time
 
-    if nonce in nonce_cache:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Replay detected")
-    nonce_cache[nonce] = current_time + NONCE_TTL
-
-    to_remove = [n for n, exp in nonce_cache.items() if current_time > exp]
-    for n in to_remove:
-        del nonce_cache[n]
-
-    method = request.method.upper()
-    path = request.url.path
-    query_params = '&'.join([f"{k}={v}" for k, v in sorted(request.query_params.items())])
-    body = await request.body()
-    body_hash = compute_body_hash(body)
-    message = f"{method}|{path}|{query_params}|{body_hash}|{timestamp}|{nonce}"
-
-    expected_signature = hmac.new(
-        current_user.api_key.encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
-
-    if not hmac.compare_digest(signature, expected_signature):
+def check_digest(signature: str, api_key: str, method: str, path: str, query: str, body_hash: str,
+                 timestamp_str: str, nonce: str):
+    message = f"{method}|{path}|{query}|{body_hash}|{int(timestamp_str)}|{nonce}"
+    if not hmac.compare_digest(signature, sign(api_key, message)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
 
+async def claim_nonce(nonce: str, current_time: int):
+    try:
+        if nonce_store.blocking:
+            fresh = await run_in_threadpool(nonce_store.add, nonce, current_time + NONCE_TTL)
+        else:
+            fresh = nonce_store.add(nonce, current_time + NONCE_TTL)
+    except KeyStoreFull:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many signed requests")
+    if not fresh:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Replay detected")
+
+def load_user(user_id: int):
+    with SessionLocal() as db:
+        return crud.get_user(db, user_id)
+
+async def signing_principal(headers: Headers):
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise credentials_error()
+    await ensure_not_revoked(token)
+    user_id = get_user_id_from_token(token)
+    principal = user_cache.get(user_id)
+    if principal is None:
+        user = await run_in_threadpool(load_user, user_id)
+        if user is None:
+            raise credentials_error()
+        principal = cache_principal(user)
+    return principal
+
+async def spool_body(receive):
+    digest = hashlib.sha256()
+    spool = SpooledTemporaryFile(max_size=SIGNATURE_SPOOL_SIZE)
+    size = 0
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnect()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > SIGNATURE_MAX_BODY:
+                raise body_too_large()
+            if chunk:
+                digest.update(chunk)
+                spool.write(chunk)
+            if not message.get("more_body", False):
+                break
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, size, digest.hexdigest() if size else ''
+
+def replay_body(spool, size: int, receive):
+    done = False
+
+    async def replay():
+        nonlocal done
+        if done:
+            return await receive()
+        chunk = spool.read(REPLAY_CHUNK_SIZE)
+        done = spool.tell() >= size
+        return {"type": "http.request", "body": chunk, "more_body": not done}
+    return replay
+
+class SignatureMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        signature = headers.get("x-signature")
+        timestamp_str = headers.get("x-timestamp")
+        nonce = headers.get("x-nonce")
+        if not all([signature, timestamp_str, nonce]):
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        state = scope.setdefault("state", {})
+        spool = error = None
+        try:
+            current_time = check_timestamp(timestamp_str)
+            length = headers.get("content-length", "")
+            if length.isdigit() and int(length) > SIGNATURE_MAX_BODY:
+                raise body_too_large()
+            principal = await signing_principal(headers)
+            spool, size, body_hash = await spool_body(receive)
+            check_digest(signature, principal.api_key, scope["method"].upper(), scope["path"],
+                         canonical_query(scope.get("query_string", b"")), body_hash, timestamp_str, nonce)
+            await claim_nonce(nonce, current_time)
+            state[VERIFIED_USER] = principal.id
+        except HTTPException as exc:
+            error = exc
+        observe_signature(time.perf_counter() - started)
+        if error is not None and error.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE:
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+            return await response(scope, receive, send)
+        if error is not None:
+            state[SIGNATURE_ERROR] = error
+        if spool is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, replay_body(spool, size, receive), send)
+        finally:
+            spool.close()
+
+async def verify_signature(request: Request, current_user: User = Depends(get_current_user)):
+    signature = request.headers.get("X-Signature")
+    timestamp_str = request.headers.get("X-Timestamp")
+    nonce = request.headers.get("X-Nonce")
+
+    if not all([signature, timestamp_str, nonce]):
+        return current_user
+
+    state = request.scope.get("state", {})
+    if SIGNATURE_ERROR in state:
+        raise state[SIGNATURE_ERROR]
+    if state.get(VERIFIED_USER) == current_user.id:
+        return current_user
+
+    started = time.perf_counter()
+    try:
+        await check_signature(request, current_user, signature, timestamp_str, nonce)
+    finally:
+        observe_signature(time.perf_counter() - started)
     return current_user
+
+async def check_signature(request: Request, current_user: User, signature: str, timestamp_str: str, nonce: str):
+    current_time = check_timestamp(timestamp_str)
+    body_hash = compute_body_hash(await request.body())
+    check_digest(signature, current_user.api_key, request.method.upper(), request.url.path,
+                 canonical_query(request.scope.get("query_string", b"")), body_hash, timestamp_str, nonce)
+    await claim_nonce(nonce, current_time)
+
+def require_admin(current_user: User = Depends(verify_signature)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return current_user
+
+def require_metrics_token(request: Request):
+    supplied = request.headers.get("Authorization", "").encode()
+    if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SECRET_KEY", "x" * 40)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.pop("DB_ASYNC", None)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+@pytest.fixture(scope="session")
+def login(client):
+    def login(username: str, role: str = "user") -> dict:
+        client.post("/auth/register", json={"username": username, "password": "pw", "role": role})
+        token = client.post("/auth/login", data={"username": username, "password": "pw"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return login
+
+@pytest.fixture(scope="session")
+def admin(login):
+    return login("admin", "admin")
+
+@pytest.fixture(scope="session")
+def make_event(client, admin):
+    client.post("/categories", json={"name": "tests"}, headers=admin)
+
+    def make_event(seats: int = 10, title: str = "Event", date: str = "2099-01-01T10:00:00") -> dict:
+        response = client.post("/events", json={"title": title, "date": date, "seats": seats, "category_name": "tests"},
+                               headers=admin)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make_event
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+CONCURRENCY = 20
+
+async def request(client, method: str, url: str, headers: dict, **kwargs):
+    response = await client.request(method, url, headers=headers, **kwargs)
+    assert response.status_code == 200, (method, url, response.status_code, response.text)
+    return response.json()
+
+async def login(client, username: str, role: str = "user") -> dict:
+    await client.post("/auth/register", json={"username": username, "password": "pw", "role": role})
+    response = await client.post("/auth/login", data={"username": username, "password": "pw"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def exercise():
+    import main
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        admin = await login(client, "admin", "admin")
+        user = await login(client, "user")
+        await request(client, "POST", "/categories", admin, json={"name": "music"})
+        event = await request(client, "POST", "/events", admin, json={
+            "title": "Concert", "date": "2099-01-01T10:00:00", "seats": 100, "category_name": "music"})
+        bookings = [await request(client, "POST", "/bookings", user, json={"event_id": event["id"], "seats": 1})
+                    for _ in range(CONCURRENCY)]
+        await asyncio.gather(*(request(client, "DELETE", f"/bookings/{booking['id']}", user)
+                               for booking in bookings))
+        assert (await request(client, "GET", f"/events/{event['id']}", admin))["seats"] == 100
+        await asyncio.gather(
+            *(request(client, "PATCH", f"/events/{event['id']}", admin, json={"seats": 100 + i})
+              for i in range(CONCURRENCY)),
+            *(request(client, "POST", "/bookings", user, json={"event_id": event["id"], "seats": 1})
+              for _ in range(CONCURRENCY)),
+        )
+        leaving = []
+        for i in range(5):
+            headers = await login(client, f"leaving{i}")
+            await request(client, "POST", "/bookings", headers, json={"event_id": event["id"], "seats": 1})
+            leaving.append(await request(client, "GET", "/users/me", headers))
+        await asyncio.gather(
+            *(request(client, "DELETE", f"/users/{member['id']}", admin) for member in leaving),
+            *(request(client, "POST", "/bookings", user, json={"event_id": event["id"], "seats": 1})
+              for _ in range(CONCURRENCY)),
+        )
+        await asyncio.gather(
+            request(client, "DELETE", f"/events/{event['id']}", admin),
+            *(client.post("/bookings", headers=user, json={"event_id": event["id"], "seats": 1})
+              for _ in range(CONCURRENCY)),
+        )
+
+def test_concurrent_writes_on_one_event_do_not_deadlock():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DB_ASYNC="1", SECRET_KEY="x" * 40,
+               DATABASE_URL="sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+    result = subprocess.run([sys.executable, os.path.abspath(__file__)], cwd=root, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    asyncio.run(exercise())
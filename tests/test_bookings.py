@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.mark.parametrize("seats", [-10, 0])
+def test_update_booking_rejects_non_positive_seats(client, login, make_event, seats):
+    user = login("resizer")
+    event = make_event(seats=5)
+    booking = client.post("/bookings", json={"event_id": event["id"], "seats": 2}, headers=user).json()
+    response = client.patch(f"/bookings/{booking['id']}", json={"seats": seats}, headers=user)
+    assert response.status_code == 422, response.text
+    assert client.get(f"/bookings/{booking['id']}", headers=user).json()["seats"] == 2
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 3
+
+def test_update_booking_changes_seats(client, login, make_event):
+    user = login("resizer")
+    event = make_event(seats=5)
+    booking = client.post("/bookings", json={"event_id": event["id"], "seats": 2}, headers=user).json()
+    response = client.patch(f"/bookings/{booking['id']}", json={"seats": 4}, headers=user)
+    assert response.status_code == 200, response.text
+    assert response.json()["seats"] == 4
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 1
@@ -0,0 +1,26 @@
+import threading
+from contextlib import ExitStack
+
+def test_compaction_archives_without_stripe_locks(client, login, admin, make_event):
+    from database import SessionLocal
+    from models import ArchivedEvent, Event
+    import compaction
+    import reservations
+    user = login("compacted")
+    event = make_event(seats=5)
+    booking = client.post("/bookings", json={"event_id": event["id"], "seats": 2}, headers=user).json()
+    assert client.delete(f"/events/{event['id']}", headers=admin).status_code == 200
+    moved = []
+    with ExitStack() as stack:
+        for stripe in reservations._stripes:
+            stack.enter_context(stripe)
+        worker = threading.Thread(target=lambda: moved.append(compaction.compact(SessionLocal, 0)), daemon=True)
+        worker.start()
+        worker.join(10)
+        assert not worker.is_alive(), "compaction waited for a reservation stripe"
+    assert moved and moved[0] >= 2
+    with SessionLocal() as db:
+        assert db.get(Event, event["id"]) is None
+        assert db.get(ArchivedEvent, event["id"]) is not None
+    history = client.get("/bookings/history", headers=user).json()
+    assert [(item["id"], item["deleted_at"] is not None) for item in history] == [(booking["id"], True)]
@@ -0,0 +1,25 @@
+import pytest
+
+@pytest.fixture(scope="module")
+def event(client, login):
+    admin = login("events-admin", "admin")
+    client.post("/categories", json={"name": "theatre"}, headers=admin)
+    response = client.post("/events", json={"title": "Play", "date": "2099-01-01T10:00:00", "seats": 10,
+                                            "category_name": "theatre"}, headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json(), admin
+
+@pytest.mark.parametrize("field, value", [("review_count", 1), ("average_rating", 5.0), ("rating", None),
+                                          ("deleted_at", "2020-01-01T00:00:00"), ("owner_id", 1), ("id", 99)])
+def test_update_event_rejects_read_only_fields(client, event, field, value):
+    created, admin = event
+    response = client.patch(f"/events/{created['id']}", json={field: value}, headers=admin)
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"]["fields"] == [field]
+    assert client.get(f"/events/{created['id']}").status_code == 200
+
+def test_update_event_changes_editable_fields(client, event):
+    created, admin = event
+    response = client.patch(f"/events/{created['id']}", json={"title": "Matinee", "seats": 12}, headers=admin)
+    assert response.status_code == 200, response.text
+    assert (response.json()["title"], response.json()["seats"]) == ("Matinee", 12)
@@ -0,0 +1,67 @@
+def hold(client, headers, event_id, seats):
+    return client.post("/holds", json={"event_id": event_id, "seats": seats}, headers=headers)
+
+def test_unsatisfiable_head_does_not_block_waitlist(client, login, admin, make_event):
+    ann, bob, cat = login("hold-ann"), login("hold-bob"), login("hold-cat")
+    event = make_event(seats=3)
+    booking = client.post("/bookings", json={"event_id": event["id"], "seats": 2}, headers=ann).json()
+    big = hold(client, bob, event["id"], 3).json()
+    small = hold(client, cat, event["id"], 1).json()
+    assert (big["status"], big["position"], small["status"], small["position"]) == ("waiting", 1, "waiting", 2)
+    assert client.patch(f"/events/{event['id']}", json={"seats": 0}, headers=admin).status_code == 200
+    assert client.delete(f"/bookings/{booking['id']}", headers=ann).status_code == 200
+    assert client.get(f"/holds/{big['id']}", headers=bob).json()["status"] == "expired"
+    assert client.get(f"/holds/{small['id']}", headers=cat).json()["status"] == "held"
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 1
+
+def test_hold_larger_than_event_is_rejected(client, login, make_event):
+    event = make_event(seats=2)
+    response = hold(client, login("hold-greedy"), event["id"], 3)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Запрошено больше мест, чем вмещает событие"
+
+def test_waiting_holds_are_limited_per_user(client, login, make_event, monkeypatch):
+    import holds
+    monkeypatch.setattr(holds, "HOLD_MAX_WAITING", 1)
+    owner, queued = login("hold-owner"), login("hold-queued")
+    first, second = make_event(seats=1), make_event(seats=1)
+    for event in (first, second):
+        assert hold(client, owner, event["id"], 1).json()["status"] == "held"
+    assert hold(client, queued, first["id"], 1).json()["status"] == "waiting"
+    response = hold(client, queued, second["id"], 1)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Слишком много заявок в листах ожидания"
+
+def test_direct_booking_yields_to_waitlist(client, login, make_event):
+    holder, waiter, booker = login("hold-holder"), login("hold-waiter"), login("hold-booker")
+    event = make_event(seats=2)
+    held = hold(client, holder, event["id"], 2).json()
+    waiting = hold(client, waiter, event["id"], 1).json()
+    assert client.delete(f"/holds/{held['id']}", headers=holder).status_code == 200
+    assert client.get(f"/holds/{waiting['id']}", headers=waiter).json()["status"] == "held"
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 1
+    more = hold(client, waiter, event["id"], 2).json()
+    assert more["status"] == "waiting"
+    response = client.post("/bookings", json={"event_id": event["id"], "seats": 1}, headers=booker)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Места раздаются через лист ожидания, используйте POST /holds"
+    batch = client.post("/bookings/batch", json={"items": [{"event_id": event["id"], "seats": 1}]}, headers=booker)
+    assert batch.status_code == 400
+    assert client.delete(f"/holds/{more['id']}", headers=waiter).status_code == 200
+    assert client.post("/bookings", json={"event_id": event["id"], "seats": 1}, headers=booker).status_code == 200
+
+def test_expired_hold_promotes_waitlist_in_order(client, login, make_event):
+    from datetime import datetime, timedelta
+    from database import SessionLocal
+    import holds
+    first, second, third = login("expiring"), login("next-in-line"), login("after-that")
+    event = make_event(seats=2)
+    held = hold(client, first, event["id"], 2).json()
+    waiting = [hold(client, user, event["id"], 1).json() for user in (second, third)]
+    assert [h["position"] for h in waiting] == [1, 2]
+    with SessionLocal() as db:
+        assert holds.expire_holds(db, datetime.utcnow() + timedelta(seconds=holds.HOLD_TTL + 1)) >= 1
+    assert client.get(f"/holds/{held['id']}", headers=first).json()["status"] == "expired"
+    assert [client.get(f"/holds/{h['id']}", headers=user).json()["status"]
+            for h, user in zip(waiting, (second, third))] == ["held", "held"]
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 0
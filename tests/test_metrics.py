@@ -0,0 +1,18 @@
+def test_metrics_require_admin_without_token(client, login, admin):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=login("metrics-user")).status_code == 403
+    response = client.get("/metrics", headers=admin)
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+def test_metrics_token(monkeypatch):
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+    import signature
+    monkeypatch.setattr(signature, "METRICS_TOKEN", "scrape-secret")
+    app = FastAPI()
+    app.get("/metrics", dependencies=[Depends(signature.require_metrics_token)])(lambda: "ok")
+    scraper = TestClient(app)
+    assert scraper.get("/metrics").status_code == 401
+    assert scraper.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert scraper.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
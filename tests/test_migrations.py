@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import select
+
+BASELINE_SCHEMA = (
+    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR, password VARCHAR, api_key VARCHAR, role VARCHAR, "
+    "PRIMARY KEY (id), UNIQUE (api_key))",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE TABLE categories (id INTEGER NOT NULL, name VARCHAR, PRIMARY KEY (id))",
+    "CREATE TABLE events (id INTEGER NOT NULL, title VARCHAR, date DATETIME, seats INTEGER, category_id INTEGER, "
+    "owner_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(category_id) REFERENCES categories (id), "
+    "FOREIGN KEY(owner_id) REFERENCES users (id))",
+    "CREATE TABLE bookings (id INTEGER NOT NULL, seats INTEGER, user_id INTEGER, event_id INTEGER, PRIMARY KEY (id), "
+    "FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(event_id) REFERENCES events (id))",
+    "CREATE TABLE reviews (id INTEGER NOT NULL, text VARCHAR, rating FLOAT, user_id INTEGER, event_id INTEGER, "
+    "is_edited INTEGER, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id), "
+    "FOREIGN KEY(event_id) REFERENCES events (id))",
+)
+
+BASELINE_ROWS = (
+    "INSERT INTO users (id, username, password, api_key, role) VALUES (1, 'ann', 'x', 'key-ann', 'admin'), "
+    "(2, 'bob', 'x', 'key-bob', 'user')",
+    "INSERT INTO categories (id, name) VALUES (1, 'music')",
+    "INSERT INTO events (id, title, date, seats, category_id, owner_id) VALUES (1, 'Concert', '2099-01-01 10:00:00', 10, 1, 1)",
+    "INSERT INTO bookings (id, seats, user_id, event_id) VALUES (1, 1, 2, 1)",
+    "INSERT INTO reviews (id, text, rating, user_id, event_id, is_edited) VALUES "
+    "(1, 'good', 4, 2, 1, 0), (2, 'bad', 2, 2, 1, 1), (3, 'great', 5, 1, 1, 0), (4, 'meh', 3, 2, 1, 0)",
+)
+
+ORPHAN_ROWS = (
+    "INSERT INTO bookings (id, seats, user_id, event_id) VALUES (2, 3, 9, 1), (3, 2, 1, 7)",
+    "INSERT INTO reviews (id, text, rating, user_id, event_id, is_edited) VALUES (5, 'lost', 1, 1, 7, 0), "
+    "(6, 'gone', 3, 9, 1, 0)",
+)
+
+def make_baseline(*statements):
+    from database import create_db_engine
+    engine = create_db_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "baseline.db"))
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        for statement in BASELINE_SCHEMA + BASELINE_ROWS + statements:
+            connection.exec_driver_sql(statement)
+        connection.commit()
+    return engine
+
+@pytest.fixture
+def baseline_engine():
+    engine = make_baseline()
+    yield engine
+    engine.dispose()
+
+def upgrade(engine):
+    from database import Base
+    import migrations
+    import ratings
+    Base.metadata.create_all(bind=engine)
+    applied = migrations.migrate(engine)
+    ratings.init_ratings(engine)
+    return applied
+
+def test_baseline_database_with_duplicate_reviews_migrates(baseline_engine, caplog):
+    from sqlalchemy.orm import Session
+    from models import ArchivedReview, EventRating, Review
+    import migrations
+    assert [version for version, _ in upgrade(baseline_engine)] == [version for version, _, _ in sorted(migrations.MIGRATIONS)]
+    assert "Moved 2 duplicate reviews" in caplog.text
+    with Session(baseline_engine) as db:
+        assert sorted(db.execute(select(Review.id, Review.user_id)).all()) == [(1, 2), (3, 1)]
+        assert sorted(db.execute(select(ArchivedReview.id, ArchivedReview.user_id, ArchivedReview.text,
+                                        ArchivedReview.is_edited)).all()) == [(2, 2, "bad", 1), (4, 2, "meh", 0)]
+        rating = db.get(EventRating, 1)
+        assert (rating.review_count, rating.rating_min, rating.rating_max) == (2, 4.0, 5.0)
+        review = Review(text="new", rating=3, user_id=1, event_id=None, is_edited=0)
+        db.add(review)
+        db.commit()
+        assert review.id == 5
+    assert upgrade(baseline_engine) == []
+
+def test_orphaned_rows_move_to_archive(caplog):
+    from sqlalchemy.orm import Session
+    from models import ArchivedBooking, ArchivedReview, Booking, Event, Review
+    engine = make_baseline(*ORPHAN_ROWS)
+    try:
+        upgrade(engine)
+        with Session(engine) as db:
+            assert db.execute(select(Booking.id)).scalars().all() == [1]
+            assert sorted(db.execute(select(ArchivedBooking.id, ArchivedBooking.user_id, ArchivedBooking.event_id))) == [
+                (2, 9, 1), (3, 1, 7)]
+            assert (5, "lost") in db.execute(select(ArchivedReview.id, ArchivedReview.text)).all()
+            assert db.execute(select(Review.user_id).where(Review.id == 6)).scalar_one() is None
+            assert db.get(Event, 1).seats == 13
+        assert "Moved 2 orphaned bookings to archived_bookings" in caplog.text
+        assert "Moved 1 orphaned reviews to archived_reviews" in caplog.text
+    finally:
+        engine.dispose()
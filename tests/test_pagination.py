@@ -0,0 +1,11 @@
+def test_oversized_limit_is_clamped(client, admin, make_event):
+    for i in range(3):
+        make_event(title=f"Paged {i}")
+    response = client.get("/events", params={"limit": 5000})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) >= 3
+    response = client.get("/events", params={"limit": 0})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 1
+    assert response.headers["X-Next-Cursor"]
+    assert client.get("/users", params={"limit": 10**6}, headers=admin).status_code == 200
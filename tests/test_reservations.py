@@ -0,0 +1,43 @@
+import threading
+
+def test_concurrent_bookings_do_not_oversell(client, login, make_event):
+    from sqlalchemy import func, select
+    from database import SessionLocal
+    from models import Booking, Event
+    from schemas import BookingCreate
+    import crud
+    user_id = client.get("/users/me", headers=login("contender")).json()["id"]
+    event = make_event(seats=10)
+    start = threading.Barrier(16)
+    results = []
+
+    def book():
+        start.wait()
+        for _ in range(5):
+            with SessionLocal() as db:
+                results.append(crud.create_booking(db, BookingCreate(event_id=event["id"], seats=1), user_id) is not None)
+
+    threads = [threading.Thread(target=book) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 10
+    with SessionLocal() as db:
+        assert db.scalar(select(Event.seats).where(Event.id == event["id"])) == 0
+        assert db.scalar(select(func.sum(Booking.seats)).where(Booking.event_id == event["id"])) == 10
+
+def test_booking_invalidates_cached_event_responses(client, login, make_event):
+    event = make_event(seats=4)
+    detail = client.get(f"/events/{event['id']}")
+    listing = client.get("/events", params={"limit": 1000})
+    assert detail.json()["seats"] == 4
+    assert client.get(f"/events/{event['id']}", headers={"If-None-Match": detail.headers["etag"]}).status_code == 304
+    booked = client.post("/bookings", json={"event_id": event["id"], "seats": 3}, headers=login("cache-buster"))
+    assert booked.status_code == 200, booked.text
+    response = client.get(f"/events/{event['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert response.status_code == 200
+    assert response.json()["seats"] == 1
+    listed = {e["id"]: e["seats"] for e in client.get("/events", params={"limit": 1000}).json()}
+    assert listed[event["id"]] == 1
+    assert listing.headers["etag"] != client.get("/events", params={"limit": 1000}).headers["etag"]
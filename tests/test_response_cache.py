@@ -0,0 +1,18 @@
+import time
+
+def test_writes_from_another_worker_invalidate_cached_events(client, make_event, monkeypatch):
+    from sqlalchemy import update
+    from database import SessionLocal
+    from models import Event
+    from response_cache import ResponseCache, response_cache
+    event = make_event(seats=5)
+    monkeypatch.setattr(response_cache, "check_interval", 0)
+    assert client.get(f"/events/{event['id']}").json()["seats"] == 5
+    with SessionLocal() as db:
+        db.execute(update(Event).where(Event.id == event["id"]).values(seats=3))
+        db.commit()
+    ResponseCache(16, 30).invalidate("events")
+    deadline = time.monotonic() + 5
+    while client.get(f"/events/{event['id']}").json()["seats"] != 3:
+        assert time.monotonic() < deadline, "cached event was not invalidated by the other worker"
+        time.sleep(0.05)
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+def test_event_reviews_issue_one_select(client):
+    from database import SessionLocal, engine
+    from models import Category, Event, Review, User
+    with SessionLocal() as db:
+        users = [User(username=f"reviewer{i}", password="x", api_key=f"reviewer-key{i}", role="user") for i in range(20)]
+        category = Category(name="reviewed")
+        db.add_all(users + [category])
+        db.flush()
+        past = Event(title="Reviewed", date=datetime.utcnow() - timedelta(days=1), seats=0,
+                     category_id=category.id, owner_id=users[0].id)
+        db.add(past)
+        db.flush()
+        db.add_all(Review(text="ok", rating=1 + i % 5, user_id=user.id, event_id=past.id, is_edited=0)
+                   for i, user in enumerate(users))
+        db.commit()
+        event_id = past.id
+    selects = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(f"/reviews/event/{event_id}")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    reviews = response.json()
+    assert len(reviews) == 20
+    assert {review["username"] for review in reviews} == {f"reviewer{i}" for i in range(20)}
+    assert {review["event_title"] for review in reviews} == {"Reviewed"}
+    assert len(selects) == 1, selects
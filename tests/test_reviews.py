@@ -0,0 +1,64 @@
+import pytest
+
+@pytest.fixture
+def review(client, login, admin, make_event):
+    user = login("reviewer")
+    event = make_event(seats=5, title="Concert")
+    assert client.post("/bookings", json={"event_id": event["id"], "seats": 1}, headers=user).status_code == 200
+    response = client.patch(f"/events/{event['id']}", json={"date": "2000-01-01T10:00:00"}, headers=admin)
+    assert response.status_code == 200, response.text
+    response = client.post("/reviews", json={"event_id": event["id"], "text": "good", "rating": 4}, headers=user)
+    assert response.status_code == 200, response.text
+    yield response.json(), user
+    client.delete(f"/reviews/{response.json()['id']}", headers=user)
+
+def stats(client, event_id):
+    return client.get(f"/events/{event_id}/stats").json()
+
+def test_update_review_coerces_rating(client, review):
+    created, user = review
+    response = client.patch(f"/reviews/{created['id']}", json={"rating": "5"}, headers=user)
+    assert response.status_code == 200, response.text
+    assert (response.json()["rating"], response.json()["is_edited"]) == (5.0, 1)
+    assert stats(client, created["event_id"])["histogram"]["5"] == 1
+
+@pytest.mark.parametrize("data", [{"rating": "five"}, {"deleted_at": "2020-01-01T00:00:00"}, {"event_id": 1},
+                                  {"user_id": 1}])
+def test_update_review_rejects_invalid_fields(client, review, data):
+    created, user = review
+    before = stats(client, created["event_id"])
+    response = client.patch(f"/reviews/{created['id']}", json=data, headers=user)
+    assert response.status_code == 422, response.text
+    after = client.get(f"/reviews/event/{created['event_id']}").json()
+    assert [(r["id"], r["rating"], r["user_id"]) for r in after] == [(created["id"], 4.0, created["user_id"])]
+    assert stats(client, created["event_id"]) == before
+
+def aggregates(event_id):
+    from database import SessionLocal
+    from models import EventRating
+    with SessionLocal() as db:
+        row = db.get(EventRating, event_id)
+        return (row.review_count, round(row.rating_sum, 6), row.rating_min, row.rating_max,
+                [getattr(row, f"stars_{s}") for s in range(1, 6)])
+
+def test_updated_aggregates_match_rebuild(client, login, review):
+    from database import SessionLocal
+    from models import Booking
+    import ratings
+    created, user = review
+    other = login("second-reviewer")
+    with SessionLocal() as db:
+        db.add(Booking(seats=1, user_id=client.get("/users/me", headers=other).json()["id"],
+                       event_id=created["event_id"]))
+        db.commit()
+    second = client.post("/reviews", json={"event_id": created["event_id"], "text": "meh", "rating": 2}, headers=other)
+    assert second.status_code == 200, second.text
+    for rating in (1, 3.5, 5):
+        response = client.patch(f"/reviews/{created['id']}", json={"rating": rating, "text": "edited"}, headers=user)
+        assert response.status_code == 200, response.text
+    assert client.patch(f"/reviews/{second.json()['id']}", json={"text": "fine"}, headers=other).status_code == 200
+    incremental = aggregates(created["event_id"])
+    assert incremental == (2, 7.0, 2.0, 5.0, [0, 1, 0, 0, 1])
+    with SessionLocal() as db:
+        ratings.rebuild_ratings(db)
+    assert aggregates(created["event_id"]) == incremental
@@ -0,0 +1,49 @@
+import hashlib
+import hmac
+import secrets
+import time
+
+import pytest
+
+def signed(api_key: str, method: str, path: str, body: bytes = b"", query: str = "") -> dict:
+    timestamp, nonce = str(int(time.time())), secrets.token_hex(8)
+    body_hash = hashlib.sha256(body).hexdigest() if body else ""
+    message = f"{method}|{path}|{query}|{body_hash}|{timestamp}|{nonce}"
+    signature = hmac.new(api_key.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return {"X-Signature": signature, "X-Timestamp": timestamp, "X-Nonce": nonce}
+
+@pytest.fixture(scope="module")
+def signer(client, login):
+    headers = login("signer")
+    api_key = client.post("/auth/login", data={"username": "signer", "password": "pw"}).json()["api_key"]
+    return headers, api_key
+
+def test_signed_request_is_verified_once(client, signer):
+    headers, api_key = signer
+    signature = signed(api_key, "GET", "/users/me")
+    assert client.get("/users/me", headers={**headers, **signature}).status_code == 200
+    assert client.get("/users/me", headers={**headers, **signature}).status_code == 403
+
+def test_bad_signature_is_rejected_on_protected_route(client, signer):
+    headers, api_key = signer
+    signature = signed(api_key, "GET", "/users/other")
+    assert client.get("/users/me", headers={**headers, **signature}).status_code == 401
+
+def test_signed_body_reaches_the_handler(client, signer, login):
+    headers, api_key = signer
+    admin = login("signature-admin", "admin")
+    client.post("/categories", json={"name": "signed"}, headers=admin)
+    event = client.post("/events", json={"title": "Signed", "date": "2099-01-01T10:00:00", "seats": 5,
+                                         "category_name": "signed"}, headers=admin).json()
+    body = f'{{"event_id": {event["id"]}, "seats": 2}}'.encode()
+    response = client.post("/bookings", content=body, headers={
+        **headers, **signed(api_key, "POST", "/bookings", body), "Content-Type": "application/json"})
+    assert response.status_code == 200, response.text
+    assert response.json()["seats"] == 2
+
+def test_public_route_ignores_signature_headers(client, signer):
+    headers, api_key = signer
+    assert client.get("/events", headers=signed(api_key, "GET", "/events")).status_code == 200
+    assert client.get("/events", headers={**headers, **signed(api_key, "GET", "/other")}).status_code == 200
+    expired = {**signed(api_key, "GET", "/events"), "X-Timestamp": "0"}
+    assert client.get("/events", headers=expired).status_code == 200